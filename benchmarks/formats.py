@@ -0,0 +1,63 @@
+"""
+Benchmark de formatos de respuesta para la vista de tabla
+(GET /projects/<id>/?view=table&subtree=true). Compara tamaño (crudo y con
+gzip) y tiempo de codificar y decodificar:
+
+- JSON con un objeto por tarea (FastJSONRenderer);
+- MessagePack con los mismos objetos;
+- MessagePack con renglones posicionales, como se manda con
+  `Accept: application/msgpack`.
+
+    python benchmarks/formats.py [renglones]
+"""
+import gzip
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "devotion.settings")
+
+import django  # noqa: E402
+django.setup()
+
+import msgpack  # noqa: E402
+from devotion.renderers import FastJSONRenderer, MessagePackRenderer  # noqa: E402
+from renderers import make_payload  # noqa: E402
+
+
+def positional(payload: dict) -> dict:
+    columns = list(payload["tasks"][0])
+    rows = [list(task.values()) for task in payload["tasks"]]
+    return {**payload, "tasks": {"columns": columns, "rows": rows}}
+
+
+def measure(render, decode, payload: dict) -> tuple[float, float, int, int]:
+    body = render(payload)
+    encode_ms = min(timeit.repeat(lambda: render(payload), number=1, repeat=5)) * 1000
+    decode_ms = min(timeit.repeat(lambda: decode(body), number=1, repeat=5)) * 1000
+    return encode_ms, decode_ms, len(body), len(gzip.compress(body))
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    payload = make_payload(rows)
+    json_renderer, msgpack_renderer = FastJSONRenderer(), MessagePackRenderer()
+
+    formats = (
+        ("JSON objetos", json_renderer.render, json.loads, payload),
+        ("msgpack objetos", msgpack_renderer.render, msgpack.unpackb, payload),
+        ("msgpack renglones", msgpack_renderer.render, msgpack.unpackb, positional(payload)),
+    )
+
+    print(f"{rows} renglones, mejor de 5 corridas")
+    print(f"{'formato':<20}{'codificar ms':>14}{'decodificar ms':>16}{'bytes':>12}{'gzip':>12}")
+    for name, render, decode, data in formats:
+        encode_ms, decode_ms, size, compressed = measure(render, decode, data)
+        print(f"{name:<20}{encode_ms:>14.2f}{decode_ms:>16.2f}{size:>12}{compressed:>12}")
+
+
+if __name__ == "__main__":
+    main()
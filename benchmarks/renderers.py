@@ -0,0 +1,74 @@
+"""
+Benchmark de renderers JSON con una respuesta grande como la de
+GET /projects/<id>/?view=table&subtree=true (renglones de la vista de tabla
+con UUID y fechas). Compara tiempo y memoria reservada del JSONRenderer de DRF
+contra FastJSONRenderer.
+
+    python benchmarks/renderers.py [renglones]
+"""
+import datetime
+import os
+import sys
+import timeit
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "devotion.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from devotion.renderers import FastJSONRenderer  # noqa: E402
+
+
+def make_payload(rows: int) -> dict:
+    project_id = uuid.uuid4()
+    today = datetime.date.today()
+    return {
+        "id": str(project_id),
+        "name": "FSAE 2024",
+        "description": None,
+        "tasks": [
+            {
+                "id": str(uuid.uuid4()),
+                "name": f"Tarea {i}",
+                "description": "Diseñar el sistema de suspensión delantera",
+                "status": i % 4,
+                "priority": i % 3,
+                "startDate": (today - datetime.timedelta(days=i % 30)).isoformat(),
+                "dueDate": today,
+                "assignee": "Sergio Pérez",
+                "parentProject": project_id,
+                "parentTask": uuid.uuid4() if i % 2 else None
+            }
+            for i in range(rows)
+        ]
+    }
+
+
+def measure(renderer, payload: dict) -> tuple[float, float, int]:
+    best = min(timeit.repeat(lambda: renderer.render(payload), number=1, repeat=5))
+
+    tracemalloc.start()
+    body = renderer.render(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 1024, len(body)
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    payload = make_payload(rows)
+
+    print(f"{rows} renglones, mejor de 5 corridas")
+    print(f"{'renderer':<20}{'ms':>10}{'KiB pico':>12}{'bytes':>12}")
+    for renderer in (JSONRenderer(), FastJSONRenderer()):
+        ms, peak, size = measure(renderer, payload)
+        print(f"{type(renderer).__name__:<20}{ms:>10.2f}{peak:>12.0f}{size:>12}")
+
+
+if __name__ == "__main__":
+    main()
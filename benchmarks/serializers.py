@@ -0,0 +1,78 @@
+"""
+Micro-benchmark del costo por renglón de CCModelSerializer.
+
+Compara la representación anterior (serializar con DRF y luego convertir cada
+clave a camelCase en cada renglón) contra la actual, con los pares (clave,
+campo) armados una vez por instancia del serializador a partir de camel_case,
+que ya guarda cada conversión. Usa instancias en memoria, sin base de datos.
+
+    python benchmarks/serializers.py [renglones]
+"""
+import datetime
+import os
+import sys
+import timeit
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "devotion.settings")
+
+import django  # noqa: E402
+django.setup()
+
+from rest_framework import serializers  # noqa: E402
+from devotion.serializers import CCModelSerializer, camel_case  # noqa: E402
+from projects.models import Project  # noqa: E402
+from tasks.models import Task  # noqa: E402
+from tasks.serializers import SubtaskKanbanSerializer, SubtaskTableSerializer  # noqa: E402
+from users.models import User  # noqa: E402
+
+
+def legacy_camel_case(snake_str: str) -> str:
+    components = snake_str.split('_')
+    return components[0] + ''.join(x.title() for x in components[1:])
+
+
+def legacy_to_representation(self, instance):
+    data = super(serializers.ModelSerializer, self).to_representation(instance)
+    return {legacy_camel_case(key): value for key, value in data.items()}
+
+
+def make_tasks(count: int) -> list[Task]:
+    project = Project(id=uuid.uuid4(), name="FSAE 2024")
+    users = [User(id=uuid.uuid4(), first_names=f"Usuario {i}", last_names="Pérez") for i in range(10)]
+    today = datetime.date.today()
+    return [
+        Task(
+            id=uuid.uuid4(), name=f"Tarea {i}", description="Lorem ipsum", status=i % 4, priority=i % 3,
+            start_date=today, due_date=today, parent_project=project, assignee=users[i % 10])
+        for i in range(count)
+    ]
+
+
+def per_row_microseconds(serializer_class: type[CCModelSerializer], tasks: list[Task], repeat: int) -> float:
+    best = min(timeit.repeat(lambda: serializer_class(tasks, many=True).data, number=1, repeat=repeat))
+    return best / len(tasks) * 1e6
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    tasks = make_tasks(rows)
+
+    print(f"{rows} renglones, mejor de 5 corridas (µs por renglón)")
+    print(f"{'serializador':<28}{'antes':>10}{'después':>10}")
+    for serializer_class in (SubtaskTableSerializer, SubtaskKanbanSerializer):
+        current = CCModelSerializer.to_representation
+        CCModelSerializer.to_representation = legacy_to_representation
+        try:
+            before = per_row_microseconds(serializer_class, tasks, 5)
+        finally:
+            CCModelSerializer.to_representation = current
+        camel_case.cache_clear()
+        after = per_row_microseconds(serializer_class, tasks, 5)
+        print(f"{serializer_class.__name__:<28}{before:>10.2f}{after:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
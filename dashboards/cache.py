@@ -0,0 +1,50 @@
+import time
+import uuid
+from typing import Iterable
+
+from django.core.cache import cache
+from projects.models import ProjectClosure
+
+
+def generation_key(project_id: uuid.UUID | str) -> str:
+    return f"dashboard:generation:{project_id}"
+
+
+def get_generation(project_id: uuid.UUID | str) -> int:
+    """
+    Versión actual de los datos del dashboard de un proyecto. Si la llave no
+    existe (nunca se creó, o el caché la sacó), empieza en la hora actual en
+    nanosegundos, que es mayor a cualquier versión usada antes; empezar en 0
+    volvería a servir entradas guardadas con una versión vieja.
+    """
+    key = generation_key(project_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = time.time_ns()
+        if not cache.add(key, generation, None):
+            # Otro request la creó al mismo tiempo
+            generation = cache.get(key, generation)
+    return generation
+
+
+def invalidate_dashboards(project_id: uuid.UUID | str | None) -> None:
+    """
+    Incrementa la versión del dashboard de un proyecto y de todos sus ancestros,
+    que también muestran métricas de su subárbol. Las entradas viejas del caché
+    simplemente dejan de consultarse.
+    """
+    if project_id is None:
+        return
+
+    ancestor_ids = ProjectClosure.objects.filter(descendant_id=project_id).values_list("ancestor_id", flat=True)
+    bump_generations(ancestor_ids)
+
+
+def bump_generations(project_ids: Iterable[uuid.UUID | str]) -> None:
+    """Incrementa la versión del dashboard de cada proyecto dado, sin tocar a sus ancestros."""
+    for project_id in project_ids:
+        key = generation_key(project_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
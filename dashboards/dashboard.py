@@ -1,34 +1,66 @@
 import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from typing import Any, Callable
 
-import pytz
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When
 from django.db.models.query import QuerySet
 from rest_framework import status
 from rest_framework.response import Response
 
-from devotion.serializers import camel_case
+from devotion.serializers import camel_case, snake_case
 from users.models import User
-from projects.models import Project, get_widget_configuration
-from tasks.models import Task
+from projects.models import Project, get_widget_configuration, get_config_number
+from tasks.models import Task, TaskStatusChange
 from tasks.subtasks import get_all_subtree
-from tasks.serializers import TaskDashboardSerializer
-from .metrics import project_metrics, set_display_types
+from tasks.serializers import TaskDashboardValuesSerializer
+from .cache import get_generation
+from .metrics import project_metrics, get_display_types, set_display_types, set_datasets, get_datasets
+from .models import TIMEZONE, ProjectSnapshot, WeeklyTaskCount, local_today
 from .metrics import WidgetType as W
 
 
 JSONObject = dict[str, Any] | list[Any] | int
+ASSIGNEE_NAME = ("assignee__first_names", "assignee__last_names")
 
 
 class DashboardBadRequest(Exception):
     pass
 
 
-def metric(*display_types: W) -> Callable:
+DATASETS: dict[str, Callable[['Dashboard'], Any]] = {}
+
+
+def dataset(func: Callable) -> Callable:
+    """Registra un conjunto de datos base que una o más métricas pueden pedir."""
+    DATASETS[func.__name__] = func
+    return func
+
+
+def metric(*display_types: W, datasets: tuple[str, ...] | dict[W | None, tuple[str, ...]] = ()) -> Callable:
+    """
+    Registra una métrica con los tipos de widget en los que se puede mostrar y
+    los conjuntos de datos que necesita, ya sea para todos sus tipos de widget
+    o por tipo de widget (con `None` como valor por defecto). La métrica recibe
+    cada conjunto como argumento con su nombre.
+    """
+    if not isinstance(datasets, dict):
+        datasets = {None: datasets}
+
     def decorator(func: Callable) -> Callable:
         if func.__name__ not in project_metrics():
             raise ValueError(f"Unknown metric: {func.__name__}")
+        for names in datasets.values():
+            for name in names:
+                if name not in DATASETS:
+                    raise ValueError(f"Unknown dataset: {name}")
         set_display_types(func.__name__, display_types)
+        set_datasets(func.__name__, datasets)
 
         def wrapper(self: 'Dashboard', widget_type: W) -> JSONObject:
             if widget_type not in display_types:
@@ -36,7 +68,8 @@ def metric(*display_types: W) -> Callable:
                     f"El tipo de widget {widget_type} no es "
                     f"válido para la métrica {func.__name__}.")
 
-            resp = func(self, widget_type)
+            needed = get_datasets(func.__name__, widget_type)
+            resp = func(self, widget_type, **{name: self.get_dataset(name) for name in needed})
 
             return {
                 "displayType": widget_type.value,
@@ -57,52 +90,322 @@ class Dashboard:
         "tasks_by_priority": W.VERTICAL_BAR,
         "user_workload": W.HEAT_MAP,
         "project_progress": W.GAUGE,
-        "all_project_progress": W.GAUGE
+        "all_project_progress": W.GAUGE,
+        "status_history": W.LINE,
+        "progress_history": W.LINE,
+        "lead_time": W.NUMBER,
+        "cycle_time": W.NUMBER,
+        "task_flow": W.BURNDOWN
     }
 
-    def __init__(self, project: Project, user: User | AnonymousUser) -> None:
+    TASK_WIDGETS = ("tasks_to_do", "tasks_to_verify")
+
+    HISTORY_DAYS = 30
+    # Días que se pueden pedir como máximo en `?from=&to=`
+    HISTORY_MAX_DAYS = 366
+    # Conjuntos de datos que dependen de `history_range`
+    RANGE_DATASETS = ("snapshots", "daily_flow")
+
+    def __init__(self, project: Project, user: User | AnonymousUser, widgets: list[str] | None = None,
+                 history_range: tuple[datetime.date, datetime.date] | None = None) -> None:
+        """
+        `widgets` limita la respuesta a ciertos widgets (en snake_case). Si es
+        None se calcula el dashboard completo. `history_range` es el rango de
+        fechas (inclusivo) de las métricas de historial; por defecto, los
+        últimos HISTORY_DAYS días.
+        """
         self.project = project
         self.user = user
-        self.project_tasks: QuerySet = project.tasks.filter(parent_task__isnull=True)
-        self.project_subtasks: QuerySet = get_all_subtree(project)
-
-        self.configuration: dict[str, W] = self.TEST_WIDGET_CONFIG \
-            if self.USE_TEST_WIDGET_CONFIG else get_widget_configuration(project.widget_config)
 
-        self.today = datetime.datetime.now(pytz.timezone("Mexico/General")).date()
-        self.end_date = self.today - datetime.timedelta(days=self.today.weekday() + 1)
-        self.start_date = self.end_date - datetime.timedelta(days=35)
-        self.tasks_last_weeks = self.project_tasks.filter(
-            start_date__gte=self.start_date,
-            start_date__lt=self.end_date
-        ).order_by("due_date")
+        if history_range is not None and history_range[0] > history_range[1]:
+            raise DashboardBadRequest("La fecha inicial no puede ser posterior a la final.")
+        if history_range is not None and (history_range[1] - history_range[0]).days >= self.HISTORY_MAX_DAYS:
+            raise DashboardBadRequest(f"El rango del historial no puede ser de más de {self.HISTORY_MAX_DAYS} días.")
+        self._history_range = history_range
+
+        if widgets is not None:
+            unknown = set(widgets) - set(project_metrics()) - set(self.TASK_WIDGETS)
+            if unknown:
+                raise DashboardBadRequest("Uno o más widgets no son válidos.")
+        self.widgets = widgets
+        self.datasets: dict[str, Any] = {}
+        # Milisegundos que tomó cada conjunto de datos y cada widget calculado
+        self.timings: dict[str, float] = {}
+
+    def includes(self, widget_name: str) -> bool:
+        return self.widgets is None or widget_name in self.widgets
+
+    @cached_property
+    def configuration(self) -> dict[str, W]:
+        if self.USE_TEST_WIDGET_CONFIG:
+            return self.TEST_WIDGET_CONFIG
+        return get_widget_configuration(self.project.widget_config)
+
+    @cached_property
+    def project_tasks(self) -> QuerySet:
+        return self.project.tasks.filter(parent_task__isnull=True)
+
+    @cached_property
+    def project_subtasks(self) -> QuerySet:
+        return get_all_subtree(self.project)
+
+    @cached_property
+    def today(self) -> datetime.date:
+        return local_today()
+
+    @cached_property
+    def end_date(self) -> datetime.date:
+        return self.today - datetime.timedelta(days=self.today.weekday() + 1)
+
+    @cached_property
+    def start_date(self) -> datetime.date:
+        return self.end_date - datetime.timedelta(days=35)
+
+    @cached_property
+    def weekly_counts(self) -> QuerySet:
+        return WeeklyTaskCount.objects.filter(project_id=self.project.id, count__gt=0)
+
+    @cached_property
+    def weekly_counts_last_weeks(self) -> QuerySet:
+        return self.weekly_counts.filter(
+            week__gte=self.start_date,
+            week__lt=self.end_date
+        )
 
-        self.last_weeks_labels = []
+    @cached_property
+    def last_weeks_labels(self) -> list[str]:
+        last_weeks_labels = []
         for i in range(5):
             start_date = self.start_date + datetime.timedelta(days=i * 7)
             end_date = start_date + datetime.timedelta(days=6)
-            self.last_weeks_labels.append(
+            last_weeks_labels.append(
                 f"{start_date.strftime('%d/%m')} - {end_date.strftime('%d/%m')}")
+        return last_weeks_labels
+
+    @cached_property
+    def history_range(self) -> tuple[datetime.date, datetime.date]:
+        if self._history_range is not None:
+            return self._history_range
+        return self.today - datetime.timedelta(days=self.HISTORY_DAYS - 1), self.today
+
+    def week_index(self, week: datetime.date) -> int:
+        """Índice (0 a 4) de una semana dentro de las últimas cinco semanas."""
+        return (week - self.start_date).days // 7
+
+    def completed_week_index(self, completed_at: datetime.datetime) -> int:
+        return self.week_index(completed_at.astimezone(TIMEZONE).date())
+
+    def cache_key(self, *parts: Any) -> str:
+        """
+        Llave de caché de este dashboard. Incluye la versión del proyecto, que
+        cambia con cada escritura, y la fecha, porque las ventanas de semanas se
+        recorren cada día.
+        """
+        generation = get_generation(self.project.id)
+        return ":".join(map(str, (
+            "dashboard", self.project.id, generation, self.today.isoformat(), *parts)))
+
+    def metric_cache_key(self, metric_name: str) -> str:
+        widget_type = self.configuration[metric_name]
+        parts = ["metric", metric_name, widget_type.value]
+        if set(self.RANGE_DATASETS) & set(get_datasets(metric_name, widget_type)):
+            parts.extend(date.isoformat() for date in self.history_range)
+        return self.cache_key(*parts)
+
+    def response_cache_key(self, media_format: str) -> str:
+        """Llave de la respuesta completa, ya codificada en un formato, para este usuario y estos widgets."""
+        widgets = "all" if self.widgets is None else ",".join(sorted(self.widgets))
+        return self.cache_key(
+            "response", media_format, get_config_number(self.configuration), self.user.id, widgets,
+            *(date.isoformat() for date in self.history_range))
 
     def get_response(self) -> Response:
-        data: JSONObject = self.get_task_widgets()
-        data["name"] = self.project.name
-
-        for metric_name in project_metrics():
-            try:
+        data: JSONObject = self.get_cached_task_widgets()
+
+        try:
+            data.update(self.get_cached_metric_widgets())
+        except DashboardBadRequest as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Los tiempos revelan detalles internos, así que solo se mandan en DEBUG o al staff
+        show_timings = self.timings and (settings.DEBUG or self.user.is_staff)
+        headers = {"Server-Timing": self.server_timing()} if show_timings else None
+        return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+    def timed(self, label: str, func: Callable, *args: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.timings[label] = (time.perf_counter() - start) * 1000
+
+    def server_timing(self) -> str:
+        """Tiempos en formato Server-Timing, visibles en las herramientas de desarrollo del navegador."""
+        return ", ".join(f"{label};dur={duration:.1f}" for label, duration in self.timings.items())
+
+    def get_cached_metric_widgets(self) -> JSONObject:
+        """
+        Parte compartida del dashboard, igual para todos los usuarios. Cada
+        métrica se guarda en caché por separado junto con su tipo de widget,
+        así que pedir solo algunos widgets no calcula los demás.
+        """
+        metric_names = [name for name in project_metrics() if self.includes(name) and hasattr(self, name)]
+        cache_keys = {name: self.metric_cache_key(name) for name in metric_names}
+        cached = cache.get_many(cache_keys.values())
+        self.load_datasets([name for name in metric_names if cache_keys[name] not in cached])
+
+        data: JSONObject = {"name": self.project.name}
+        computed = {}
+        for metric_name in metric_names:
+            cache_key = cache_keys[metric_name]
+            if cache_key in cached:
+                resp = cached[cache_key]
+            else:
                 widget = getattr(self, metric_name)
-            except AttributeError:
-                continue
-
-            try:
-                resp = widget(self.configuration[metric_name])
-            except DashboardBadRequest as e:
-                return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                resp = computed[cache_key] = self.timed(
+                    camel_case(metric_name), widget, self.configuration[metric_name])
 
             if resp is not None:
                 data[camel_case(metric_name)] = resp
 
-        return Response(data, status=status.HTTP_200_OK)
+        cache.set_many(computed, settings.DASHBOARD_CACHE_TIMEOUT)
+        return data
+
+    def get_cached_task_widgets(self) -> JSONObject:
+        """Parte del dashboard que depende del usuario."""
+        if self.user == AnonymousUser() or not any(map(self.includes, self.TASK_WIDGETS)):
+            return {}
+
+        cache_key = self.cache_key("user", self.user.id)
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.timed("tasks", self.get_task_widgets)
+            cache.set(cache_key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+
+        return {key: value for key, value in data.items() if self.includes(snake_case(key))}
+
+    # Datasets
+
+    def plan_datasets(self, metric_names: list[str]) -> list[str]:
+        """Conjuntos de datos que necesitan las métricas dadas, sin repetir."""
+        needed = {}
+        for metric_name in metric_names:
+            widget_type = self.configuration[metric_name]
+            if widget_type in get_display_types(metric_name):
+                needed.update(dict.fromkeys(get_datasets(metric_name, widget_type)))
+        return list(needed)
+
+    def load_datasets(self, metric_names: list[str]) -> None:
+        """
+        Consulta una sola vez cada conjunto de datos que necesitan las métricas.
+        Con DASHBOARD_WORKERS mayor a 1 las consultas se hacen en paralelo; las
+        métricas después solo transforman los datos, así que se evalúan en serie.
+        """
+        names = [name for name in self.plan_datasets(metric_names) if name not in self.datasets]
+        workers = min(settings.DASHBOARD_WORKERS, len(names))
+
+        if workers <= 1:
+            for name in names:
+                self.get_dataset(name)
+            return
+
+        # Las propiedades compartidas se calculan antes para no repetirlas en cada hilo
+        for shared_property in ("project_subtasks", "weekly_counts_last_weeks", "history_range"):
+            getattr(self, shared_property)
+
+        # Cada hilo recibe un grupo de datasets, así que abre una sola conexión
+        groups = [names[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for loaded in executor.map(self.load_datasets_in_thread, groups):
+                self.datasets.update(loaded)
+
+    def load_datasets_in_thread(self, names: list[str]) -> dict[str, Any]:
+        try:
+            return {name: self.timed(f"dataset-{name}", DATASETS[name], self) for name in names}
+        finally:
+            # Django abre una conexión por hilo; se cierra al terminar el grupo para no dejarla abierta
+            connections.close_all()
+
+    def get_dataset(self, name: str) -> Any:
+        if name not in self.datasets:
+            self.datasets[name] = self.timed(f"dataset-{name}", DATASETS[name], self)
+        return self.datasets[name]
+
+    @dataset
+    def task_counts(self) -> dict[str, int]:
+        """Todos los conteos por estado y prioridad del tablero, en una sola consulta."""
+        top_level = Q(parent_project_id=self.project.id, parent_task__isnull=True)
+        counts = {
+            f"status_{value}": Count("id", filter=top_level & Q(status=value))
+            for value in Task.Status.values
+        }
+        counts.update({
+            f"priority_{value}": Count("id", filter=top_level & Q(priority=value))
+            for value in Task.Priority.values
+        })
+        counts["all_done"] = Count("id", filter=Q(status=Task.Status.DONE))
+        return self.project_subtasks.aggregate(**counts)
+
+    @dataset
+    def last_weeks(self) -> list[dict[str, Any]]:
+        """Conteos de tareas de las últimas cinco semanas por semana y asignado."""
+        return list(self.weekly_counts_last_weeks.values(
+            "week", *ASSIGNEE_NAME
+        ).annotate(total=Sum("count")).order_by(*ASSIGNEE_NAME, "week"))
+
+    @dataset
+    def assignee_totals(self) -> list[dict[str, Any]]:
+        """Conteos de tareas de todo el proyecto por asignado."""
+        return list(self.weekly_counts.values(
+            *ASSIGNEE_NAME
+        ).annotate(total=Sum("count")).order_by(*ASSIGNEE_NAME))
+
+    @dataset
+    def completed_last_weeks(self) -> list[dict[str, Any]]:
+        """
+        Tareas de primer nivel completadas en las últimas cinco semanas, con sus
+        fechas de creación y de primer paso a "en progreso". Es una consulta por
+        rango sobre el índice (proyecto, completed_at).
+        """
+        started_at = TaskStatusChange.objects.filter(
+            task_id=OuterRef("id"), to_status=Task.Status.IN_PROGRESS
+        ).order_by("changed_at").values("changed_at")[:1]
+
+        return list(self.project_tasks.filter(
+            completed_at__gte=TIMEZONE.localize(datetime.datetime.combine(self.start_date, datetime.time.min)),
+            completed_at__lt=TIMEZONE.localize(datetime.datetime.combine(self.end_date, datetime.time.min))
+        ).annotate(started_at=Subquery(started_at)).values("created_at", "started_at", "completed_at"))
+
+    @dataset
+    def snapshots(self) -> list[dict[str, Any]]:
+        """Fotos diarias del proyecto dentro del rango del historial."""
+        return list(self.project.snapshots.filter(
+            date__range=self.history_range
+        ).order_by("date").values("date", *ProjectSnapshot.status_fields, "progress"))
+
+    @dataset
+    def daily_flow(self) -> list[dict[int, int]]:
+        """
+        Cuántas tareas de primer nivel había en cada estado al final de cada día
+        del rango del historial. Los días anteriores al rango se suman en la
+        misma consulta como un solo renglón.
+        """
+        date_from, date_to = self.history_range
+        rows = self.project.daily_task_counts.filter(date__lte=date_to).annotate(
+            day=Case(When(date__lt=date_from, then=Value(date_from)), default=F("date"))
+        ).values("day", "status").annotate(total=Sum("count"))
+
+        changes = {}
+        for row in rows:
+            changes.setdefault(row["day"], {})[row["status"]] = row["total"]
+
+        current = {value: 0 for value in Task.Status.values}
+        days = []
+        for i in range((date_to - date_from).days + 1):
+            for status_value, total in changes.get(date_from + datetime.timedelta(days=i), {}).items():
+                current[status_value] += total
+            days.append(dict(current))
+        return days
 
     # Task widgets
 
@@ -110,100 +413,87 @@ class Dashboard:
         if self.user == AnonymousUser():
             return {}
 
-        is_leader = self.user in self.project.leaders.all()
-        tasks_to_do = self.project_subtasks.filter(
-            assignee_id=self.user.id,
-            status__in=(Task.Status.NOT_STARTED, Task.Status.IN_PROGRESS)
+        is_leader = self.project.leaders.filter(id=self.user.id).exists()
+        to_do_statuses = (Task.Status.NOT_STARTED, Task.Status.IN_PROGRESS)
+        assigned = Q(assignee_id=self.user.id)
+        top_level = Q(parent_project_id=self.project.id, parent_task__isnull=True)
+
+        to_verify = Q(status=Task.Status.IN_REVIEW) & (top_level if is_leader else assigned)
+        tasks = self.project_subtasks.filter(
+            (assigned & Q(status__in=to_do_statuses)) | to_verify
         )
 
-        if is_leader:
-            tasks_to_verify = self.project_tasks.filter(
-                status=Task.Status.IN_REVIEW
-            )
-        else:
-            tasks_to_verify = self.project_subtasks.filter(
-                assignee_id=self.user.id,
-                status=Task.Status.IN_REVIEW
-            )
+        tasks_to_do, tasks_to_verify = [], []
+        for task, (task_status,) in TaskDashboardValuesSerializer.serialize_with(tasks, "status"):
+            if task_status == Task.Status.IN_REVIEW:
+                tasks_to_verify.append(task)
+            else:
+                tasks_to_do.append(task)
 
         return {
-            "tasksToDo": TaskDashboardSerializer(tasks_to_do, many=True).data,
-            "tasksToVerify": TaskDashboardSerializer(tasks_to_verify, many=True).data
+            "tasksToDo": tasks_to_do,
+            "tasksToVerify": tasks_to_verify
         }
 
     # Metric widgets
 
-    @metric(W.NUMBER)
-    def done_tasks_count(self, widget_type: W) -> JSONObject:
-        done_tasks = self.project_tasks.filter(
-            status=Task.Status.DONE
-        )
+    @metric(W.NUMBER, datasets=("task_counts",))
+    def done_tasks_count(self, widget_type: W, task_counts: dict[str, int]) -> JSONObject:
         return [{
             "name": "Tareas Completadas",
-            "value": done_tasks.count()
+            "value": task_counts[f"status_{Task.Status.DONE}"]
         }]
 
-    @metric(W.NUMBER)
-    def all_done_tasks_count(self, widget_type: W) -> JSONObject:
-        done_tasks = self.project_subtasks.filter(
-            status=Task.Status.DONE
-        )
+    @metric(W.NUMBER, datasets=("task_counts",))
+    def all_done_tasks_count(self, widget_type: W, task_counts: dict[str, int]) -> JSONObject:
         return [{
             "name": "Tareas y subtareas completadas",
-            "value": done_tasks.count()
+            "value": task_counts["all_done"]
         }]
 
-    @metric(W.LINE, W.VERTICAL_BAR, W.HORIZONTAL_BAR, W.HEAT_MAP)
-    def done_tasks_by_date(self, widget_type: W) -> JSONObject:
-        tasks = self.tasks_last_weeks.filter(
-            status=Task.Status.DONE
-        ).order_by("due_date")
-
+    @metric(W.LINE, W.VERTICAL_BAR, W.HORIZONTAL_BAR, W.HEAT_MAP, datasets=("completed_last_weeks",))
+    def done_tasks_by_date(self, widget_type: W, completed_last_weeks: list[dict[str, Any]]) -> JSONObject:
         week_counts = [0 for _ in range(5)]
+        for task in completed_last_weeks:
+            week_counts[self.completed_week_index(task["completed_at"])] += 1
 
         if widget_type in (W.LINE, W.HEAT_MAP):
-            series = []
-            for task in tasks:
-                days_difference = (task.start_date - self.start_date).days
-                index = days_difference // 7
-                week_counts[index] += 1
-
-            for label, count in zip(self.last_weeks_labels, week_counts):
-                series.append({"name": label, "value": count})
+            series = [
+                {"name": label, "value": count}
+                for label, count in zip(self.last_weeks_labels, week_counts)
+            ]
 
             return [
                 {"name": "Completed Tasks", "series": series}
             ]
 
         else:
-            for task in tasks:
-                days_difference = (task.start_date - self.start_date).days
-                index = days_difference // 7
-                week_counts[index] += 1
-
             return [
                 {"name": label, "value": count}
                 for label, count in zip(self.last_weeks_labels, week_counts)
             ]
 
-    @metric(W.PIE, W.VERTICAL_BAR, W.HORIZONTAL_BAR, W.HEAT_MAP)
-    def tasks_by_status(self, widget_type: W) -> JSONObject:
-        not_started_tasks = self.project_tasks.filter(
-            status=Task.Status.NOT_STARTED
-        ).count()
-
-        in_progress_tasks = self.project_tasks.filter(
-            status=Task.Status.IN_PROGRESS
-        ).count()
+    def average_days(self, tasks: list[dict[str, Any]], since_field: str, widget_type: W, name: str) -> JSONObject:
+        """Promedio en días desde `since_field` hasta completarse, en total o por semana."""
+        week_days = [[] for _ in range(5)]
+        for task in tasks:
+            if task[since_field] is not None:
+                days = (task["completed_at"] - task[since_field]).total_seconds() / 86400
+                week_days[self.completed_week_index(task["completed_at"])].append(days)
 
-        in_review_tasks = self.project_tasks.filter(
-            status=Task.Status.IN_REVIEW
-        ).count()
+        def average(days: list[float]) -> float:
+            return round(sum(days) / len(days), 1) if days else 0
 
-        done_tasks = self.project_tasks.filter(
-            status=Task.Status.DONE
-        ).count()
+        if widget_type == W.NUMBER:
+            return [{"name": name, "value": average([days for week in week_days for days in week])}]
+        else:
+            return [
+                {"name": label, "value": average(days)}
+                for label, days in zip(self.last_weeks_labels, week_days)
+            ]
 
+    @metric(W.PIE, W.VERTICAL_BAR, W.HORIZONTAL_BAR, W.HEAT_MAP, datasets=("task_counts",))
+    def tasks_by_status(self, widget_type: W, task_counts: dict[str, int]) -> JSONObject:
         labels = (
             "No iniciado",
             "En progreso",
@@ -212,10 +502,8 @@ class Dashboard:
         )
 
         counts = (
-            not_started_tasks,
-            in_progress_tasks,
-            in_review_tasks,
-            done_tasks
+            task_counts[f"status_{value}"]
+            for value in Task.Status.values
         )
 
         return [
@@ -223,34 +511,21 @@ class Dashboard:
             for label, count in zip(labels, counts)
         ]
 
-    @metric(W.PIE, W.VERTICAL_BAR, W.HORIZONTAL_BAR, W.HEAT_MAP)
-    def tasks_by_priority(self, widget_type: W) -> JSONObject:
-        low_tasks = self.project_tasks.filter(
-            priority=Task.Priority.LOW
-        ).count()
-
-        medium_tasks = self.project_tasks.filter(
-            priority=Task.Priority.MEDIUM
-        ).count()
-
-        high_tasks = self.project_tasks.filter(
-            priority=Task.Priority.HIGH
-        ).count()
-
+    @metric(W.PIE, W.VERTICAL_BAR, W.HORIZONTAL_BAR, W.HEAT_MAP, datasets=("task_counts",))
+    def tasks_by_priority(self, widget_type: W, task_counts: dict[str, int]) -> JSONObject:
         labels = (
             "Baja",
             "Media",
             "Alta"
         )
 
-        counts = (
-            low_tasks,
-            medium_tasks,
-            high_tasks
+        counts = tuple(
+            task_counts[f"priority_{value}"]
+            for value in Task.Priority.values
         )
 
         if widget_type == W.HEAT_MAP:
-            max_count = max(value for _, value in counts)
+            max_count = max(counts) or 1
             return [
                 {"name": label, "value": count / max_count}
                 for label, count in zip(labels, counts)
@@ -261,21 +536,21 @@ class Dashboard:
                 for label, count in zip(labels, counts)
             ]
 
-    @metric(W.HEAT_MAP, W.PIE, W.VERTICAL_BAR, W.HORIZONTAL_BAR, W.NUMBERS)
-    def user_workload(self, widget_type: W) -> JSONObject:
+    @metric(W.HEAT_MAP, W.PIE, W.VERTICAL_BAR, W.HORIZONTAL_BAR, W.NUMBERS,
+            datasets={W.HEAT_MAP: ("last_weeks",), None: ("assignee_totals",)})
+    def user_workload(self, widget_type: W, last_weeks: list[dict[str, Any]] | None = None,
+                      assignee_totals: list[dict[str, Any]] | None = None) -> JSONObject:
         user_workload = {}
 
         # Caso Heat Map
         if widget_type == W.HEAT_MAP:
-            for task in self.tasks_last_weeks:
-                if str(task.assignee) not in user_workload:
-                    user_workload[str(task.assignee)] = [
+            for week in last_weeks:
+                name = f"{week['assignee__first_names']} {week['assignee__last_names']}"
+                if name not in user_workload:
+                    user_workload[name] = [
                         {"name": label, "value": 0} for label in self.last_weeks_labels
                     ]
-
-                days_difference = (task.start_date - self.start_date).days
-                index = days_difference // 7
-                user_workload[str(task.assignee)][index]["value"] += 1
+                user_workload[name][self.week_index(week["week"])]["value"] += week["total"]
 
             return [
                 {"name": user, "series": counts}
@@ -284,15 +559,97 @@ class Dashboard:
 
         # Caso Vertical Bar o Horizontal Bar
         else:
-            for task in self.project_tasks:
-                if task.assignee:
-                    assignee_name = str(task.assignee)
-                    if assignee_name not in user_workload:
-                        user_workload[assignee_name] = 0
-                    user_workload[assignee_name] += 1
+            for assignee in assignee_totals:
+                name = f"{assignee['assignee__first_names']} {assignee['assignee__last_names']}"
+                user_workload[name] = user_workload.get(name, 0) + assignee["total"]
 
             return [{"name": key, "value": value} for key, value in user_workload.items()]
 
     @metric(W.GAUGE)
     def project_progress(self, widget_type: W) -> JSONObject:
         return [{"name": self.project.name, "value": self.project.progress}]
+
+    @metric(W.GAUGE)
+    def all_project_progress(self, widget_type: W) -> JSONObject:
+        return [{"name": self.project.name, "value": self.project.subtree_progress}]
+
+    @metric(W.NUMBER, W.VERTICAL_BAR, W.HORIZONTAL_BAR, datasets=("completed_last_weeks",))
+    def lead_time(self, widget_type: W, completed_last_weeks: list[dict[str, Any]]) -> JSONObject:
+        return self.average_days(completed_last_weeks, "created_at", widget_type, "Días de creación a completada")
+
+    @metric(W.NUMBER, W.VERTICAL_BAR, W.HORIZONTAL_BAR, datasets=("completed_last_weeks",))
+    def cycle_time(self, widget_type: W, completed_last_weeks: list[dict[str, Any]]) -> JSONObject:
+        return self.average_days(completed_last_weeks, "started_at", widget_type, "Días de en progreso a completada")
+
+    @metric(W.BURNDOWN, W.CUMULATIVE_FLOW, datasets=("daily_flow",))
+    def task_flow(self, widget_type: W, daily_flow: list[dict[int, int]]) -> JSONObject:
+        date_from = self.history_range[0]
+        labels = [
+            (date_from + datetime.timedelta(days=i)).strftime("%d/%m/%Y")
+            for i in range(len(daily_flow))
+        ]
+
+        if widget_type == W.BURNDOWN:
+            remaining = [
+                sum(total for status_value, total in day.items() if status_value != Task.Status.DONE)
+                for day in daily_flow
+            ]
+            # Línea ideal: de lo pendiente al inicio del rango hasta cero al final
+            steps = max(len(remaining) - 1, 1)
+            ideal = [remaining[0] * (1 - i / steps) for i in range(len(remaining))]
+
+            return [
+                {"name": "Pendientes", "series": [
+                    {"name": label, "value": value} for label, value in zip(labels, remaining)
+                ]},
+                {"name": "Ideal", "series": [
+                    {"name": label, "value": round(value, 1)} for label, value in zip(labels, ideal)
+                ]}
+            ]
+
+        else:
+            status_labels = (
+                "No iniciado",
+                "En progreso",
+                "En revisión",
+                "Completado"
+            )
+
+            return [
+                {"name": status_label, "series": [
+                    {"name": label, "value": day[status_value]} for label, day in zip(labels, daily_flow)
+                ]}
+                for status_label, status_value in zip(status_labels, Task.Status.values)
+            ]
+
+    @metric(W.LINE, W.HEAT_MAP, datasets=("snapshots",))
+    def status_history(self, widget_type: W, snapshots: list[dict[str, Any]]) -> JSONObject:
+        labels = (
+            "No iniciado",
+            "En progreso",
+            "En revisión",
+            "Completado"
+        )
+
+        return [
+            {
+                "name": label,
+                "series": [
+                    {"name": snapshot["date"].strftime("%d/%m/%Y"), "value": snapshot[field]}
+                    for snapshot in snapshots
+                ]
+            }
+            for label, field in zip(labels, ProjectSnapshot.status_fields)
+        ]
+
+    @metric(W.LINE, W.VERTICAL_BAR, W.HORIZONTAL_BAR, datasets=("snapshots",))
+    def progress_history(self, widget_type: W, snapshots: list[dict[str, Any]]) -> JSONObject:
+        progress = [
+            {"name": snapshot["date"].strftime("%d/%m/%Y"), "value": snapshot["progress"]}
+            for snapshot in snapshots
+        ]
+
+        if widget_type == W.LINE:
+            return [{"name": "Progreso", "series": progress}]
+        else:
+            return progress
@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboards.models import local_today
+from dashboards.snapshots import take_project_snapshots
+
+
+class Command(BaseCommand):
+    help = "Guarda la foto diaria de conteos y progreso de todos los proyectos (pensado para correr una vez al día)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Fecha de la foto (YYYY-MM-DD). Por defecto, hoy.")
+
+    def handle(self, *args, **options):
+        if options["date"]:
+            try:
+                date = datetime.date.fromisoformat(options["date"])
+            except ValueError:
+                raise CommandError("La fecha debe tener el formato YYYY-MM-DD.")
+        else:
+            date = local_today()
+
+        count = take_project_snapshots(date)
+        self.stdout.write(self.style.SUCCESS(f"Se guardaron {count} fotos de proyectos del {date}."))
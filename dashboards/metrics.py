@@ -11,6 +11,8 @@ class WidgetType(IntEnum):
     PIE = 5
     HEAT_MAP = 6
     GAUGE = 7
+    BURNDOWN = 8
+    CUMULATIVE_FLOW = 9
 
 
 PROJECT_METRICS: dict[str, tuple[WidgetType, ...]] = {
@@ -21,9 +23,17 @@ PROJECT_METRICS: dict[str, tuple[WidgetType, ...]] = {
     "tasks_by_priority": (),
     "user_workload": (),
     "project_progress": (),
-    "all_project_progress": ()
+    "all_project_progress": (),
+    "status_history": (),
+    "progress_history": (),
+    "lead_time": (),
+    "cycle_time": (),
+    "task_flow": ()
 }
 
+# Datos base que necesita cada métrica según su tipo de widget (None aplica a cualquier tipo)
+METRIC_DATASETS: dict[str, dict[WidgetType | None, tuple[str, ...]]] = {}
+
 
 def project_metrics() -> list[str]:
     return list(PROJECT_METRICS.keys())
@@ -35,3 +45,12 @@ def set_display_types(metric_name: str, display_types: tuple[WidgetType, ...]) -
 
 def get_display_types(metric_name: str) -> tuple[WidgetType, ...]:
     return PROJECT_METRICS[metric_name]
+
+
+def set_datasets(metric_name: str, datasets: dict[WidgetType | None, tuple[str, ...]]) -> None:
+    METRIC_DATASETS[metric_name] = datasets
+
+
+def get_datasets(metric_name: str, widget_type: WidgetType) -> tuple[str, ...]:
+    datasets = METRIC_DATASETS.get(metric_name, {})
+    return datasets.get(widget_type, datasets.get(None, ()))
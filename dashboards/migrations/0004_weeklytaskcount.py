@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from dashboards.models import week_start
+
+
+def populate_weekly_task_counts(apps, _schema_editor):
+    Task = apps.get_model("tasks", "Task")
+    WeeklyTaskCount = apps.get_model("dashboards", "WeeklyTaskCount")
+    counts = {}
+
+    top_level_tasks = Task.objects.filter(parent_task__isnull=True).values_list(
+        "parent_project_id", "start_date", "assignee_id")
+    for project_id, start_date, assignee_id in top_level_tasks.iterator():
+        key = (project_id, week_start(start_date), assignee_id)
+        counts[key] = counts.get(key, 0) + 1
+
+    WeeklyTaskCount.objects.bulk_create([
+        WeeklyTaskCount(project_id=project_id, week=week, assignee_id=assignee_id, count=count)
+        for (project_id, week, assignee_id), count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0003_remove_widget_data_source_remove_widget_project_and_more'),
+        ('projects', '0009_project_subtree_counters'),
+        ('tasks', '0004_task_root_calendar_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyTaskCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('assignee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_task_counts', to='projects.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'week', 'assignee'), name='unique_weekly_task_count')],
+            },
+        ),
+        migrations.RunPython(populate_weekly_task_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0004_weeklytaskcount'),
+        ('projects', '0010_history_widget_config'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('not_started', models.PositiveIntegerField(default=0)),
+                ('in_progress', models.PositiveIntegerField(default=0)),
+                ('in_review', models.PositiveIntegerField(default=0)),
+                ('done', models.PositiveIntegerField(default=0)),
+                ('low_priority', models.PositiveIntegerField(default=0)),
+                ('medium_priority', models.PositiveIntegerField(default=0)),
+                ('high_priority', models.PositiveIntegerField(default=0)),
+                ('progress', models.FloatField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='projects.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'date'), name='unique_project_snapshot')],
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:47
+
+from collections import Counter
+
+import django.db.models.deletion
+import pytz
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+NOT_STARTED = 0
+DONE = 3
+
+
+def populate_daily_task_counts(apps, _schema_editor):
+    # Sin historial de estados, cada tarea cuenta en su estado actual desde el día
+    # en que se creó. Las terminadas cuentan como no iniciadas hasta el día de su
+    # completed_at, para que el burndown también muestre ese trabajo pendiente
+    Task = apps.get_model("tasks", "Task")
+    DailyTaskCount = apps.get_model("dashboards", "DailyTaskCount")
+    local_timezone = pytz.timezone("Mexico/General")
+    tasks = Task.objects.filter(parent_task__isnull=True)
+    counts = Counter()
+
+    rows = tasks.exclude(status=DONE, completed_at__isnull=False).values(
+        "parent_project_id", "status", date=TruncDate("created_at", tzinfo=local_timezone)
+    ).annotate(total=Count("id"))
+    for row in rows:
+        counts[row["parent_project_id"], row["date"], row["status"]] += row["total"]
+
+    rows = tasks.filter(status=DONE, completed_at__isnull=False).values(
+        "parent_project_id",
+        created=TruncDate("created_at", tzinfo=local_timezone),
+        completed=TruncDate("completed_at", tzinfo=local_timezone)
+    ).annotate(total=Count("id"))
+    for row in rows:
+        project_id, total = row["parent_project_id"], row["total"]
+        completed = max(row["created"], row["completed"])
+        counts[project_id, row["created"], NOT_STARTED] += total
+        counts[project_id, completed, NOT_STARTED] -= total
+        counts[project_id, completed, DONE] += total
+
+    DailyTaskCount.objects.bulk_create([
+        DailyTaskCount(project_id=project_id, date=date, status=status, count=count)
+        for (project_id, date, status), count in counts.items() if count
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboards', '0005_projectsnapshot'),
+        ('projects', '0012_widget_config_base_10'),
+        ('tasks', '0005_task_status_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTaskCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.SmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_task_counts', to='projects.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'date', 'status'), name='unique_daily_task_count')],
+            },
+        ),
+        migrations.RunPython(populate_daily_task_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,115 @@
+import datetime
+import uuid
+
+import pytz
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+# Zona horaria con la que el dashboard decide a qué día o semana pertenece algo
+TIMEZONE = pytz.timezone("Mexico/General")
+
+
+def local_today() -> datetime.date:
+    return timezone.localdate(timezone=TIMEZONE)
+
+
+def week_start(date: datetime.date) -> datetime.date:
+    """Domingo con el que empieza la semana de una fecha, igual que las semanas del dashboard."""
+    return date - datetime.timedelta(days=(date.weekday() + 1) % 7)
+
+
+class WeeklyTaskCount(models.Model):
+    """
+    Conteo de tareas de primer nivel de un proyecto, agrupadas por la semana
+    de su fecha de inicio y su asignado. Se actualiza con cada escritura de
+    tareas para que las gráficas semanales no recorran tareas.
+    """
+    project = models.ForeignKey(
+        "projects.Project", on_delete=models.CASCADE, null=False, blank=False, related_name="weekly_task_counts")
+    week = models.DateField(null=False, blank=False)
+    assignee = models.ForeignKey(
+        "users.User", on_delete=models.CASCADE, null=False, blank=False, related_name="+")
+    count = models.IntegerField(default=0, null=False, blank=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("project", "week", "assignee"), name="unique_weekly_task_count")
+        ]
+
+
+class ProjectSnapshot(models.Model):
+    """
+    Foto diaria de los conteos de tareas de primer nivel y el progreso de un
+    proyecto, para graficar tendencias sin recorrer el historial de tareas.
+    """
+    project = models.ForeignKey(
+        "projects.Project", on_delete=models.CASCADE, null=False, blank=False, related_name="snapshots")
+    date = models.DateField(null=False, blank=False)
+    not_started = models.PositiveIntegerField(default=0, null=False, blank=False)
+    in_progress = models.PositiveIntegerField(default=0, null=False, blank=False)
+    in_review = models.PositiveIntegerField(default=0, null=False, blank=False)
+    done = models.PositiveIntegerField(default=0, null=False, blank=False)
+    low_priority = models.PositiveIntegerField(default=0, null=False, blank=False)
+    medium_priority = models.PositiveIntegerField(default=0, null=False, blank=False)
+    high_priority = models.PositiveIntegerField(default=0, null=False, blank=False)
+    progress = models.FloatField(default=0, null=False, blank=False)
+
+    # Campos de conteo en el orden de Task.Status y Task.Priority
+    status_fields = ("not_started", "in_progress", "in_review", "done")
+    priority_fields = ("low_priority", "medium_priority", "high_priority")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=("project", "date"), name="unique_project_snapshot")
+        ]
+
+
+class DailyTaskCount(models.Model):
+    """
+    Cambio neto, en un día, del número de tareas de primer nivel de un proyecto
+    que están en cada estado. Sumar los días hasta una fecha da cuántas tareas
+    había en cada estado ese día (burndown y flujo acumulado).
+    """
+    project = models.ForeignKey(
+        "projects.Project", on_delete=models.CASCADE, null=False, blank=False, related_name="daily_task_counts")
+    date = models.DateField(null=False, blank=False)
+    status = models.SmallIntegerField(null=False, blank=False)
+    count = models.IntegerField(default=0, null=False, blank=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=("project", "date", "status"), name="unique_daily_task_count")
+        ]
+
+
+WeeklyTaskKey = tuple[uuid.UUID, datetime.date, uuid.UUID]
+DailyTaskKey = tuple[uuid.UUID, int]
+
+
+def add_count(model: type[models.Model], delta: int, **lookup) -> None:
+    """Suma (o resta) al campo `count` del registro de un modelo de conteo, creándolo si no existe."""
+    counts = model.objects.filter(**lookup)
+
+    if counts.update(count=F("count") + delta):
+        return
+
+    try:
+        with transaction.atomic():
+            model.objects.create(count=delta, **lookup)
+    except IntegrityError:
+        # Otro request creó el registro al mismo tiempo
+        counts.update(count=F("count") + delta)
+
+
+def add_weekly_task_count(key: WeeklyTaskKey, delta: int) -> None:
+    """Suma (o resta) al conteo semanal de una combinación, creando el registro si no existe."""
+    project_id, week, assignee_id = key
+    add_count(WeeklyTaskCount, delta, project_id=project_id, week=week, assignee_id=assignee_id)
+
+
+def add_daily_task_count(key: DailyTaskKey, delta: int) -> None:
+    """Registra que hoy entraron (o salieron, si es negativo) tareas de un estado."""
+    project_id, status = key
+    add_count(DailyTaskCount, delta, project_id=project_id, date=local_today(), status=status)
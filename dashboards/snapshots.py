@@ -0,0 +1,46 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from projects.models import Project
+from tasks.models import Task
+from .cache import bump_generations
+from .models import ProjectSnapshot
+
+
+def take_project_snapshots(date: datetime.date) -> int:
+    """
+    Guarda (o reemplaza) la foto del día de todos los proyectos. Los conteos de
+    todas las tareas de primer nivel salen de una sola consulta agrupada por
+    proyecto. Regresa cuántas fotos se guardaron.
+    """
+    counts = {
+        field: Count("id", filter=Q(status=value))
+        for field, value in zip(ProjectSnapshot.status_fields, Task.Status.values)
+    }
+    counts.update({
+        field: Count("id", filter=Q(priority=value))
+        for field, value in zip(ProjectSnapshot.priority_fields, Task.Priority.values)
+    })
+    task_counts = {
+        row.pop("parent_project_id"): row
+        for row in Task.objects.filter(parent_task__isnull=True).values("parent_project_id").annotate(**counts)
+    }
+
+    snapshots = []
+    for project in Project.objects.only("id", "total_tasks", "done_tasks"):
+        snapshots.append(ProjectSnapshot(
+            project_id=project.id,
+            date=date,
+            progress=project.progress,
+            **task_counts.get(project.id, {})
+        ))
+
+    with transaction.atomic():
+        ProjectSnapshot.objects.filter(date=date).delete()
+        ProjectSnapshot.objects.bulk_create(snapshots, batch_size=500)
+
+    # Las gráficas de historial del día ya no están al corriente
+    bump_generations(snapshot.project_id for snapshot in snapshots)
+    return len(snapshots)
@@ -1,3 +1,347 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from rest_framework.renderers import BaseRenderer
+from rest_framework.test import APIClient
+from users.models import User
+from projects.models import Project
+from tasks.models import Task, TaskStatusChange
+from .cache import generation_key
+from .dashboard import Dashboard
+from .metrics import WidgetType as W
+from .models import TIMEZONE, DailyTaskCount, ProjectSnapshot, WeeklyTaskCount
+from .views import DashboardView
+
+
+class PlainTextRenderer(BaseRenderer):
+    media_type = "text/plain"
+    format = "txt"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return str(data).encode()
+
+
+class DashboardTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.checo = User.objects.create(
+            email="sergioperez@devotion.com",
+            first_names="Sergio",
+            last_names="Pérez"
+        )
+        self.verstappen = User.objects.create(
+            email="maxverstappen@devotion.com",
+            first_names="Max",
+            last_names="Verstappen"
+        )
+        self.fsae = Project.objects.create(name="FSAE 2024")
+        self.fsae.leaders.set([self.checo])
+        self.fsae.members.set([self.checo, self.verstappen])
+        self.chasis = Project.objects.create(name="Chasis", parent=self.fsae)
+        self.chasis.leaders.set([self.checo])
+        self.chasis.members.set([self.checo, self.verstappen])
+
+        today = datetime.date.today()
+        statuses = (Task.Status.NOT_STARTED, Task.Status.IN_PROGRESS, Task.Status.IN_REVIEW, Task.Status.DONE)
+        self.tasks = [
+            self.create_task(f"Tarea {i}", self.fsae, status, Task.Priority.HIGH if i < 3 else Task.Priority.LOW,
+                             self.verstappen if i % 2 else self.checo, today - datetime.timedelta(days=7 * i))
+            for i, status in enumerate(statuses)
+        ]
+        self.create_task("Subtarea", self.fsae, Task.Status.DONE, Task.Priority.MEDIUM, self.checo, today,
+                         parent_task=self.tasks[0])
+        self.create_task("Soldadura", self.chasis, Task.Status.DONE, Task.Priority.MEDIUM, self.checo, today)
+
+    def create_task(self, name: str, project: Project, status: int, priority: int, assignee: User,
+                    start_date: datetime.date, parent_task: Task | None = None) -> Task:
+        return Task.objects.create(
+            name=name,
+            start_date=start_date,
+            due_date=start_date,
+            parent_project=project,
+            parent_task=parent_task,
+            assignee=assignee,
+            status=status,
+            priority=priority,
+        )
+
+    def get_dashboard(self) -> dict:
+        response = self.client.get(f"/projects/{self.fsae.id}/dashboard/")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_counters(self):
+        data = self.get_dashboard()
+        self.assertEqual(data["doneTasksCount"]["data"][0]["value"], 1)
+        self.assertEqual(data["allDoneTasksCount"]["data"][0]["value"], 3)
+        self.assertEqual([item["value"] for item in data["tasksByStatus"]["data"]], [1, 1, 1, 1])
+        self.assertEqual([item["value"] for item in data["tasksByPriority"]["data"]], [1, 0, 3])
+
+    def test_task_widgets(self):
+        self.client.force_authenticate(self.verstappen)
+        data = self.get_dashboard()
+        self.assertEqual([task["name"] for task in data["tasksToDo"]], ["Tarea 1"])
+        self.assertEqual(data["tasksToVerify"], [])
+
+        self.client.force_authenticate(self.checo)
+        data = self.get_dashboard()
+        self.assertEqual([task["name"] for task in data["tasksToDo"]], ["Tarea 0"])
+        self.assertEqual([task["name"] for task in data["tasksToVerify"]], ["Tarea 2"])
+        self.assertEqual(data["tasksToVerify"][0]["parentProject"], "FSAE 2024")
+
+    def test_cache(self):
+        self.client.force_authenticate(self.checo)
+        data = self.get_dashboard()
+        self.assertEqual(data["doneTasksCount"]["data"][0]["value"], 1)
+
+        # Con el caché caliente solo se consulta el proyecto
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_dashboard(), data)
+
+        response = self.client.put(f"/tasks/{self.tasks[0].id}/status/", {"status": Task.Status.DONE})
+        self.assertEqual(response.status_code, 200)
+        data = self.get_dashboard()
+        self.assertEqual(data["doneTasksCount"]["data"][0]["value"], 2)
+        self.assertEqual(data["tasksToDo"], [])
+
+        # Cambiar una tarea de un subproyecto invalida también el dashboard del proyecto raíz
+        soldadura = Task.objects.get(name="Soldadura")
+        response = self.client.put(f"/tasks/{soldadura.id}/status/", {"status": Task.Status.IN_PROGRESS})
+        self.assertEqual(response.status_code, 200)
+        data = self.get_dashboard()
+        self.assertEqual(data["allDoneTasksCount"]["data"][0]["value"], 3)
+
+    def test_evicted_generation(self):
+        self.client.force_authenticate(self.checo)
+        self.assertEqual(self.get_dashboard()["doneTasksCount"]["data"][0]["value"], 1)
+        self.client.put(f"/tasks/{self.tasks[0].id}/status/", {"status": Task.Status.DONE})
+
+        # Si el caché saca la versión, la nueva nunca coincide con una ya usada
+        cache.delete(generation_key(self.fsae.id))
+        self.assertEqual(self.get_dashboard()["doneTasksCount"]["data"][0]["value"], 2)
+
+    def test_compressed_cache(self):
+        self.client.force_authenticate(self.checo)
+        url = f"/projects/{self.fsae.id}/dashboard/"
+        data = json.loads(json.dumps(self.get_dashboard()))
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(json.loads(gzip.decompress(response.content)), data)
+
+        # La segunda vez se mandan los mismos bytes comprimidos, sin armar el dashboard
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(cached["Content-Encoding"], "gzip")
+        self.assertEqual(cached.content, response.content)
+
+        # Otros widgets usan otra entrada; esta respuesta es tan chica que no se comprime
+        subset = self.client.get(url + "?widgets=doneTasksCount", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(subset.has_header("Content-Encoding"))
+        self.assertEqual(list(json.loads(subset.content)), ["name", "doneTasksCount"])
+
+        # Un cambio en las tareas invalida la respuesta guardada
+        self.client.put(f"/tasks/{self.tasks[0].id}/status/", {"status": Task.Status.DONE})
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(json.loads(gzip.decompress(response.content))["doneTasksCount"]["data"][0]["value"], 2)
+
+    def test_uncached_formats(self):
+        # Solo JSON y MessagePack se guardan comprimidos; otro formato (como el HTML de
+        # la API navegable, que lleva el token CSRF de la sesión) se arma cada vez
+        renderer_classes = [*DashboardView.renderer_classes, PlainTextRenderer]
+        url = f"/projects/{self.fsae.id}/dashboard/?format=txt"
+        with mock.patch.object(DashboardView, "renderer_classes", renderer_classes):
+            for _ in range(2):
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response["Content-Type"].startswith("text/plain"))
+                self.assertFalse(hasattr(response, "compressed_cache_key"))
+
+    def test_weekly_task_counts(self):
+        Dashboard.USE_TEST_WIDGET_CONFIG = True
+        self.addCleanup(setattr, Dashboard, "USE_TEST_WIDGET_CONFIG", False)
+
+        data = self.get_dashboard()
+        workload = {user["name"]: sum(week["value"] for week in user["series"])
+                    for user in data["userWorkload"]["data"]}
+        end_date = Dashboard(self.fsae, self.checo).end_date
+        self.assertEqual(sum(workload.values()), len([task for task in self.tasks if task.start_date < end_date]))
+
+        # Cambiar el estado no mueve registros del conteo semanal
+        rows = list(WeeklyTaskCount.objects.values_list("id", "count"))
+        self.tasks[0].status = Task.Status.DONE
+        self.tasks[0].save()
+        self.assertEqual(list(WeeklyTaskCount.objects.values_list("id", "count")), rows)
+
+        # Reasignar, completar y borrar tareas mueve los conteos sin recorrer tareas
+        self.tasks[3].assignee = self.checo
+        self.tasks[3].save()
+        self.tasks[1].delete()
+        counts = WeeklyTaskCount.objects.filter(project=self.fsae, count__gt=0)
+        self.assertEqual(counts.filter(assignee=self.verstappen).count(), 0)
+        self.assertEqual(sum(counts.values_list("count", flat=True)), 3)
+
+        # Borrar una instancia vieja descuenta los registros en los que la tarea cuenta ahora
+        stale = Task.objects.get(id=self.tasks[2].id)
+        self.tasks[2].assignee = self.verstappen
+        self.tasks[2].status = Task.Status.DONE
+        self.tasks[2].save()
+        stale.delete()
+        self.assertFalse(WeeklyTaskCount.objects.filter(count__lt=0).exists())
+        self.assertFalse(WeeklyTaskCount.objects.filter(assignee=self.verstappen, count__gt=0).exists())
+        daily = DailyTaskCount.objects.filter(project=self.fsae).values("status").annotate(total=Sum("count"))
+        self.assertEqual({row["status"]: row["total"] for row in daily if row["total"]}, {Task.Status.DONE: 2})
+
+    def test_selected_widgets(self):
+        self.client.force_authenticate(self.checo)
+        response = self.client.get(f"/projects/{self.fsae.id}/dashboard/?widgets=tasksByStatus,tasksToDo")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {"name", "tasksByStatus", "tasksToDo"})
+
+        response = self.client.get(f"/projects/{self.fsae.id}/dashboard/?widgets=noExiste")
+        self.assertEqual(response.status_code, 400)
+
+        # Cambiar el tipo de un widget regresa el dashboard completo, o solo lo pedido en `?widgets=`
+        url = f"/projects/{self.fsae.id}/dashboard/"
+        response = self.client.put(url, {"tasks_by_status": W.PIE}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["tasksByStatus"]["displayType"], W.PIE)
+        self.assertEqual(set(response.data), set(self.get_dashboard()))
+
+        response = self.client.put(url + "?widgets=tasksByStatus", {"tasks_by_status": W.VERTICAL_BAR}, format="json")
+        self.assertEqual(set(response.data), {"name", "tasksByStatus"})
+        self.assertEqual(response.data["tasksByStatus"]["displayType"], W.VERTICAL_BAR)
+
+    def test_shared_datasets(self):
+        Dashboard.USE_TEST_WIDGET_CONFIG = True
+        self.addCleanup(setattr, Dashboard, "USE_TEST_WIDGET_CONFIG", False)
+
+        # Cada conjunto de datos se consulta una sola vez, aunque lo usen varias métricas
+        dashboard = Dashboard(self.fsae, self.checo)
+        self.assertEqual(dashboard.plan_datasets(list(Dashboard.TEST_WIDGET_CONFIG)),
+                         ["task_counts", "completed_last_weeks", "last_weeks", "snapshots", "daily_flow"])
+        with self.assertNumQueries(5):
+            data = dashboard.get_cached_metric_widgets()
+        self.assertEqual(len(data), len(Dashboard.TEST_WIDGET_CONFIG) + 1)
+
+    def test_history(self):
+        Dashboard.USE_TEST_WIDGET_CONFIG = True
+        self.addCleanup(setattr, Dashboard, "USE_TEST_WIDGET_CONFIG", False)
+
+        call_command("snapshot_projects", date="2024-03-01", stdout=StringIO())
+        self.tasks[0].status = Task.Status.DONE
+        self.tasks[0].save()
+        call_command("snapshot_projects", date="2024-03-02", stdout=StringIO())
+        self.assertEqual(ProjectSnapshot.objects.filter(project=self.fsae).count(), 2)
+
+        response = self.client.get(
+            f"/projects/{self.fsae.id}/dashboard/?widgets=statusHistory,progressHistory&from=2024-03-01&to=2024-03-31")
+        self.assertEqual(response.status_code, 200)
+        done = response.data["statusHistory"]["data"][3]
+        self.assertEqual(done["name"], "Completado")
+        self.assertEqual([day["value"] for day in done["series"]], [1, 2])
+        progress = response.data["progressHistory"]["data"][0]["series"]
+        self.assertLess(progress[0]["value"], progress[1]["value"])
+
+        for params in ("from=2024-03-31&to=2024-03-01", "from=0001-01-01&to=9999-12-31", "to=0001-01-05"):
+            with self.subTest(params=params):
+                response = self.client.get(f"/projects/{self.fsae.id}/dashboard/?{params}")
+                self.assertEqual(response.status_code, 400)
+
+    def test_completion_times(self):
+        Dashboard.USE_TEST_WIDGET_CONFIG = True
+        self.addCleanup(setattr, Dashboard, "USE_TEST_WIDGET_CONFIG", False)
+        self.client.force_authenticate(self.checo)
+
+        tarea = self.tasks[0]
+        for new_status in (Task.Status.IN_PROGRESS, Task.Status.DONE):
+            response = self.client.put(f"/tasks/{tarea.id}/status/", {"status": new_status})
+            self.assertEqual(response.status_code, 200)
+        changes = TaskStatusChange.objects.filter(task=tarea).order_by("changed_at")
+        self.assertEqual([change.to_status for change in changes], [0, 1, 3])
+        self.assertEqual(changes[2].changed_by, self.checo)
+
+        # Se mueven los tiempos a la semana pasada: 4 días desde la creación y 2 desde que se empezó
+        tarea.refresh_from_db()
+        self.assertIsNotNone(tarea.completed_at)
+        completed_at = TIMEZONE.localize(datetime.datetime.combine(
+            Dashboard(self.fsae, self.checo).end_date - datetime.timedelta(days=1), datetime.time(12)))
+        Task.objects.filter(id=tarea.id).update(
+            completed_at=completed_at, created_at=completed_at - datetime.timedelta(days=4))
+        changes.filter(to_status=Task.Status.IN_PROGRESS).update(changed_at=completed_at - datetime.timedelta(days=2))
+
+        data = self.get_dashboard()
+        self.assertEqual([week["value"] for week in data["doneTasksByDate"]["data"][0]["series"]], [0, 0, 0, 0, 1])
+        self.assertEqual(data["leadTime"]["data"][0]["value"], 4)
+        self.assertEqual(data["cycleTime"]["data"][0]["value"], 2)
+
+        # Regresar la tarea a revisión desde el PUT general también la descompleta
+        response = self.client.put(f"/tasks/{tarea.id}/", {"status": Task.Status.IN_REVIEW})
+        self.assertEqual(response.status_code, 200)
+        tarea.refresh_from_db()
+        self.assertIsNone(tarea.completed_at)
+        self.assertEqual(TaskStatusChange.objects.filter(task=tarea).count(), 4)
+
+    def test_task_flow(self):
+        self.client.force_authenticate(self.checo)
+        today = Dashboard(self.fsae, self.checo).today
+        yesterday = today - datetime.timedelta(days=1)
+        # Las tareas de primer nivel de FSAE existían desde ayer
+        DailyTaskCount.objects.filter(project=self.fsae).update(date=yesterday)
+
+        response = self.client.put(f"/tasks/{self.tasks[0].id}/status/", {"status": Task.Status.DONE})
+        self.assertEqual(response.status_code, 200)
+        self.tasks[1].delete()
+
+        url = f"/projects/{self.fsae.id}/dashboard/?widgets=taskFlow&from={yesterday}&to={today}"
+        data = self.client.get(url).data["taskFlow"]
+        self.assertEqual(data["displayType"], W.BURNDOWN)
+        self.assertEqual([day["value"] for day in data["data"][0]["series"]], [3, 1])
+        self.assertEqual([day["value"] for day in data["data"][1]["series"]], [3, 0])
+
+        self.client.put(f"/projects/{self.fsae.id}/dashboard/", {"task_flow": W.CUMULATIVE_FLOW}, format="json")
+        data = self.client.get(url).data["taskFlow"]
+        self.assertEqual({status["name"]: [day["value"] for day in status["series"]] for status in data["data"]}, {
+            "No iniciado": [1, 0],
+            "En progreso": [1, 0],
+            "En revisión": [1, 1],
+            "Completado": [1, 2]
+        })
+
+
+class ParallelDashboardTestCase(TransactionTestCase):
+    """Los hilos usan sus propias conexiones, así que los datos deben estar confirmados."""
+    setUp = DashboardTestCase.setUp
+    create_task = DashboardTestCase.create_task
+
+    def test_parallel_datasets(self):
+        Dashboard.USE_TEST_WIDGET_CONFIG = True
+        self.addCleanup(setattr, Dashboard, "USE_TEST_WIDGET_CONFIG", False)
+
+        self.fsae.refresh_from_db()
+        serial = Dashboard(self.fsae, self.checo).get_cached_metric_widgets()
+        cache.clear()
+        with self.settings(DASHBOARD_WORKERS=4):
+            self.client.force_authenticate(self.checo)
+            response = self.client.get(f"/projects/{self.fsae.id}/dashboard/")
+
+        self.assertEqual({key: response.data[key] for key in serial}, serial)
+        self.assertFalse(response.has_header("Server-Timing"))
+
+        # Los tiempos solo se mandan al staff (o en DEBUG)
+        cache.clear()
+        self.checo.is_staff = True
+        self.checo.save()
+        with self.settings(DASHBOARD_WORKERS=4):
+            response = self.client.get(f"/projects/{self.fsae.id}/dashboard/")
+        timings = response["Server-Timing"]
+        self.assertIn("dataset-task_counts;dur=", timings)
+        self.assertIn("tasksByStatus;dur=", timings)
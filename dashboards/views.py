@@ -1,17 +1,71 @@
+import datetime
+
+from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework import status
 
+from devotion.middleware import cache_compressed, cached_compressed_response
+from devotion.serializers import snake_case
 from projects.models import Project, get_config_number, get_widget_configuration
-from .dashboard import Dashboard
+from .dashboard import Dashboard, DashboardBadRequest
 from .metrics import WidgetType, get_display_types
+from .models import local_today
+
+# Formatos cuyos bytes no dependen de la sesión; el HTML de la API navegable
+# lleva el token CSRF y datos del usuario, así que nunca se guarda
+CACHED_RESPONSE_FORMATS = ("json", "msgpack")
 
 
 def bad_request(message: str) -> Response:
     return Response({"message": message}, status=status.HTTP_400_BAD_REQUEST)
 
 
+def requested_widgets(request: Request) -> list[str] | None:
+    """Widgets pedidos en `?widgets=` (separados por comas, en camelCase o snake_case)."""
+    widgets = request.query_params.get("widgets")
+    if not widgets:
+        return None
+    return [snake_case(name.strip()) for name in widgets.split(",") if name.strip()]
+
+
+def requested_history_range(request: Request) -> tuple[datetime.date, datetime.date] | None:
+    """Rango de `?from=` y `?to=` (YYYY-MM-DD) para las métricas de historial."""
+    date_from = request.query_params.get("from")
+    date_to = request.query_params.get("to")
+    if not date_from and not date_to:
+        return None
+
+    try:
+        date_to = datetime.date.fromisoformat(date_to) if date_to else local_today()
+        date_from = datetime.date.fromisoformat(date_from) if date_from \
+            else date_to - datetime.timedelta(days=Dashboard.HISTORY_DAYS - 1)
+    except ValueError:
+        raise DashboardBadRequest("Las fechas deben tener el formato YYYY-MM-DD.")
+    except OverflowError:
+        raise DashboardBadRequest("El rango del historial se sale de las fechas válidas.")
+    return date_from, date_to
+
+
+def dashboard_response(project: Project, request: Request, widgets: list[str] | None) -> Response:
+    try:
+        dashboard = Dashboard(project, request.user, widgets, requested_history_range(request))
+    except DashboardBadRequest as e:
+        return bad_request(str(e))
+
+    media_format = request.accepted_renderer.format
+    if media_format not in CACHED_RESPONSE_FORMATS:
+        return dashboard.get_response()
+
+    # Si ya se mandó esta misma respuesta comprimida, se reusan sus bytes
+    cache_key = dashboard.response_cache_key(media_format)
+    cached = cached_compressed_response(request, cache_key)
+    if cached is not None:
+        return cached
+    return cache_compressed(dashboard.get_response(), cache_key, settings.DASHBOARD_CACHE_TIMEOUT)
+
+
 class DashboardView(APIView):
     def get(self, request: Request, project_id: str) -> Response:
         try:
@@ -19,8 +73,7 @@ class DashboardView(APIView):
         except Project.DoesNotExist:
             return Response({"message": "El proyecto no existe."}, status=status.HTTP_404_NOT_FOUND)
 
-        dashboard = Dashboard(project, request.user)
-        return dashboard.get_response()
+        return dashboard_response(project, request, requested_widgets(request))
 
     # TODO: Validar que el usuario sea miembro o líder del proyecto, quizás
     def put(self, request: Request, project_id: str) -> Response:
@@ -50,5 +103,6 @@ class DashboardView(APIView):
             project.widget_config = get_config_number(config)
             project.save()
 
-        dashboard = Dashboard(project, request.user)
-        return dashboard.get_response()
+        # El dashboard completo, o solo los widgets de `?widgets=`; las métricas
+        # que no cambiaron salen del caché
+        return dashboard_response(project, request, requested_widgets(request))
@@ -32,11 +32,8 @@ def acl_callback(_request_id, _response, exception) -> None:
 
 
 def get_calendar_id(task: "Task") -> str:
-    project = task.parent_project
-    while project:
-        if project.calendar_id:
-            return project.calendar_id
-        project = project.parent
+    if task.root_calendar_id:
+        return task.root_calendar_id
     raise serializers.ValidationError("No se encontró el calendario del proyecto.")
 
 
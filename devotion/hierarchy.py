@@ -0,0 +1,126 @@
+from typing import Any
+from django.db import connections, models, router
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import QuerySet
+from django.db.models.expressions import RawSQL
+
+RECURSIVE_SQL_VENDORS = ("sqlite", "postgresql", "mysql", "oracle")
+
+
+def breadcrumbs_cache_key(kind: str, node_id: Any) -> str:
+    return f"breadcrumbs:{kind}:{node_id}"
+
+
+def insert_node(closure: type[models.Model], node_id: Any, parent_id: Any | None) -> None:
+    """Registra un nodo nuevo en la tabla de cierre, debajo de su papá (si tiene)."""
+    links = [closure(ancestor_id=node_id, descendant_id=node_id, depth=0)]
+
+    if parent_id is not None:
+        parent_ancestors = closure.objects.filter(descendant_id=parent_id).values_list("ancestor_id", "depth")
+        links += [
+            closure(ancestor_id=ancestor_id, descendant_id=node_id, depth=depth + 1)
+            for ancestor_id, depth in parent_ancestors
+        ]
+
+    closure.objects.bulk_create(links)
+
+
+def move_subtree(closure: type[models.Model], node_id: Any, new_parent_id: Any | None) -> None:
+    """Cuelga el subárbol de un nodo debajo de un nuevo papá (o lo vuelve raíz)."""
+    subtree_ids = closure.objects.filter(ancestor_id=node_id).values("descendant_id")
+
+    # Se rompen los enlaces entre el subárbol y sus ancestros anteriores
+    closure.objects.filter(
+        descendant_id__in=subtree_ids
+    ).exclude(
+        ancestor_id__in=subtree_ids
+    ).delete()
+
+    if new_parent_id is None:
+        return
+
+    new_ancestors = list(closure.objects.filter(descendant_id=new_parent_id).values_list("ancestor_id", "depth"))
+    descendants = list(closure.objects.filter(ancestor_id=node_id).values_list("descendant_id", "depth"))
+
+    closure.objects.bulk_create([
+        closure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=ancestor_depth + descendant_depth + 1)
+        for ancestor_id, ancestor_depth in new_ancestors
+        for descendant_id, descendant_depth in descendants
+    ])
+
+
+def is_descendant(closure: type[models.Model], node_id: Any, ancestor_id: Any) -> bool:
+    """Indica si un nodo está dentro del subárbol de otro (incluyéndolo)."""
+    return closure.objects.filter(ancestor_id=ancestor_id, descendant_id=node_id).exists()
+
+
+def rebuild_closure(closure: type[models.Model], nodes: dict[Any, Any]) -> None:
+    """
+    Reconstruye la tabla de cierre completa a partir de la lista de adyacencia.
+    `nodes` mapea el id de cada nodo al id de su papá.
+    """
+    closure.objects.all().delete()
+    links = []
+
+    for node_id in nodes:
+        ancestor_id, depth = node_id, 0
+        while ancestor_id is not None:
+            links.append(closure(ancestor_id=ancestor_id, descendant_id=node_id, depth=depth))
+            ancestor_id = nodes.get(ancestor_id)
+            depth += 1
+
+    closure.objects.bulk_create(links, batch_size=1000)
+
+
+def _recursive_subtree_sql(
+        connection: BaseDatabaseWrapper, model: type[models.Model], parent_field: str, include_root: bool) -> str:
+    """Genera el SQL (CTE recursivo o CONNECT BY) que obtiene los ids de un subárbol."""
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    pk = quote(model._meta.pk.column)
+    parent = quote(model._meta.get_field(parent_field).column)
+    anchor = pk if include_root else parent
+
+    if connection.vendor == "oracle":
+        return (
+            f"SELECT {pk} FROM {table} "
+            f"START WITH {anchor} = %s "
+            f"CONNECT BY PRIOR {pk} = {parent}"
+        )
+
+    return (
+        f"WITH RECURSIVE subtree (node_id) AS ("
+        f"SELECT {pk} FROM {table} WHERE {anchor} = %s "
+        f"UNION ALL "
+        f"SELECT child.{pk} FROM {table} child INNER JOIN subtree ON child.{parent} = subtree.node_id"
+        f") SELECT node_id FROM subtree"
+    )
+
+
+def _python_subtree_ids(model: type[models.Model], parent_field: str, root_id: Any, include_root: bool) -> list[Any]:
+    """Recorre el subárbol nivel por nivel (una consulta por nivel, no por nodo)."""
+    subtree_ids = [root_id] if include_root else []
+    level = [root_id]
+
+    while level:
+        level = list(model.objects.filter(**{f"{parent_field}__in": level}).values_list("pk", flat=True))
+        subtree_ids += level
+
+    return subtree_ids
+
+
+def subtree_queryset(
+        model: type[models.Model], parent_field: str, root_id: Any, include_root: bool = False) -> QuerySet:
+    """
+    Obtiene el subárbol de un nodo en un solo viaje a la base de datos, usando
+    WITH RECURSIVE (SQLite, Postgres) o CONNECT BY (Oracle). En otros motores se
+    recorre el árbol desde Python. El resultado es un QuerySet encadenable.
+    """
+    connection = connections[router.db_for_read(model)]
+
+    if connection.vendor not in RECURSIVE_SQL_VENDORS:
+        return model.objects.filter(pk__in=_python_subtree_ids(model, parent_field, root_id, include_root))
+
+    sql = _recursive_subtree_sql(connection, model, parent_field, include_root)
+    root_id = model._meta.pk.get_db_prep_value(root_id, connection)
+    return model.objects.filter(pk__in=RawSQL(sql, (root_id,)))
@@ -0,0 +1,141 @@
+import gzip
+import re
+from typing import Iterator
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from django.http.response import HttpResponseBase
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Niveles pensados para respuestas dinámicas: casi toda la reducción, poco CPU
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+ACCEPT_ENCODING_RE = re.compile(r"\s*([\w*]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*")
+
+
+def accepted_encoding(request: HttpRequest) -> str | None:
+    """Codificación con la que se comprime la respuesta: brotli si se puede, si no gzip, o ninguna."""
+    accepted = set()
+    for part in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        match = ACCEPT_ENCODING_RE.fullmatch(part)
+        if match is None:
+            continue
+        encoding, quality = match.groups()
+        try:
+            if quality is not None and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(encoding.lower())
+
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(sequence: Iterator[bytes], encoding: str) -> Iterator[bytes]:
+    if encoding == "gzip":
+        yield from compress_sequence(sequence)
+        return
+
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for item in sequence:
+        # Se vacía el compresor en cada bloque para que el cliente reciba datos mientras se generan
+        yield compressor.process(item) + compressor.flush()
+    yield compressor.finish()
+
+
+def compressed_cache_key(cache_key: str, encoding: str) -> str:
+    return f"{cache_key}:{encoding}"
+
+
+def cached_compressed_response(request: HttpRequest, cache_key: str) -> HttpResponse | None:
+    """
+    Respuesta ya comprimida que se guardó con cache_compressed, si el cliente
+    acepta la misma codificación. Así se evita volver a armarla, renderizarla y
+    comprimirla.
+    """
+    encoding = accepted_encoding(request)
+    if encoding is None:
+        return None
+
+    cached = cache.get(compressed_cache_key(cache_key, encoding))
+    if cached is None:
+        return None
+
+    content_type, content = cached
+    response = HttpResponse(content, content_type=content_type)
+    response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+def cache_compressed(response: HttpResponseBase, cache_key: str, timeout: int) -> HttpResponseBase:
+    """Pide a CompressionMiddleware que guarde en caché los bytes comprimidos de esta respuesta."""
+    response.compressed_cache_key = cache_key
+    response.compressed_cache_timeout = timeout
+    return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Comprime con brotli (si está instalado) o gzip las respuestas de al menos
+    COMPRESSION_MIN_SIZE bytes, según el header Accept-Encoding. Las respuestas
+    en streaming se comprimen por bloques. Si la vista marcó la respuesta con
+    cache_compressed, los bytes comprimidos también se guardan en caché.
+    """
+    def process_response(self, request: HttpRequest, response: HttpResponseBase) -> HttpResponseBase:
+        if response.has_header("Content-Encoding"):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = accepted_encoding(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                return response
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response["Content-Length"]
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+            cache_key = getattr(response, "compressed_cache_key", None)
+            if cache_key is not None and response.status_code == 200:
+                cache.set(
+                    compressed_cache_key(cache_key, encoding),
+                    (response["Content-Type"], compressed),
+                    response.compressed_cache_timeout
+                )
+
+        # El contenido cambió, así que un ETag fuerte ya no aplica
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+
+        response["Content-Encoding"] = encoding
+        return response
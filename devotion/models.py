@@ -0,0 +1,38 @@
+from typing import Any
+from django.db import models
+
+
+class TrackedModel(models.Model):
+    """
+    Modelo abstracto que recuerda con qué valores se cargaron ciertos campos,
+    para saber qué cambió al momento de guardar.
+    """
+    tracked_fields: tuple[str, ...] = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.remember_loaded_values()
+
+    def remember_loaded_values(self) -> None:
+        self._loaded_values = {field: self.__dict__.get(field) for field in self.tracked_fields}
+
+    def loaded_value(self, field: str) -> Any:
+        """Valor del campo al cargarse (o al guardarse por última vez)."""
+        try:
+            return self._loaded_values[field]
+        except (AttributeError, KeyError):
+            return getattr(self, field)
+
+    def has_changed(self, field: str) -> bool:
+        # Las llaves pueden asignarse como str y cargarse como UUID
+        to_python = self._meta.get_field(field).to_python
+        return to_python(getattr(self, field)) != to_python(self.loaded_value(field))
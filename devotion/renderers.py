@@ -0,0 +1,72 @@
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+encoder_default = JSONEncoder().default
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z if orjson else 0
+
+
+def escape_line_separators(content: bytes) -> bytes:
+    """Escapa U+2028 y U+2029 como JSONRenderer, para que el JSON también sea JavaScript válido."""
+    return content.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+
+
+def dumps(data) -> bytes:
+    """Codifica a JSON compacto, igual que FastJSONRenderer."""
+    if orjson is None:
+        content = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+    else:
+        content = orjson.dumps(data, default=encoder_default, option=ORJSON_OPTIONS)
+    return escape_line_separators(content)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Renderer JSON basado en orjson, que codifica UUID, date y datetime de forma
+    nativa. Lo demás (strings traducibles, Decimal, querysets...) pasa por el
+    encoder de DRF, y U+2028 y U+2029 se escapan igual, así que la salida es la
+    misma que la de JSONRenderer. Si orjson no está instalado, o se pide la
+    respuesta con sangría (`; indent=`), se usa el JSONRenderer de DRF.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b""
+        return dumps(data)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer binario para clientes que mandan `Accept: application/msgpack`
+    (la app de iOS). Los valores que MessagePack no conoce (UUID, fechas) se
+    codifican igual que en JSON. Las vistas de tareas además mandan renglones
+    posicionales en este formato; ver wants_positional_rows.
+    """
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encoder_default, use_bin_type=True)
+
+
+def wants_positional_rows(request) -> bool:
+    """Si la respuesta se va a codificar en un formato compacto, con las listas de tareas como renglones."""
+    renderer = getattr(request, "accepted_renderer", None)
+    return isinstance(renderer, MessagePackRenderer)
@@ -1,13 +1,141 @@
+from functools import lru_cache
+from typing import Any, Callable, Iterator
+
+from django.db.models import QuerySet
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
 
 
+# Las claves posibles son pocas (campos y métricas), así que se recuerdan todas
+@lru_cache(maxsize=None)
 def camel_case(snake_str: str) -> str:
     components = snake_str.split('_')
     return components[0] + ''.join(x.title() for x in components[1:])
 
 
+def snake_case(camel_str: str) -> str:
+    return ''.join(f"_{c.lower()}" if c.isupper() else c for c in camel_str)
+
+
 class CCModelSerializer(serializers.ModelSerializer):
-    """Model Serializer abstracto que convierte las claves de los campos a camelCase."""
+    """
+    Model Serializer abstracto que convierte las claves de los campos a camelCase.
+    """
+    def camel_case_fields(self) -> list[tuple[str, serializers.Field]]:
+        # Los campos se copian por instancia del serializador (una sola vez con many=True)
+        try:
+            return self._camel_case_fields
+        except AttributeError:
+            self._camel_case_fields = [(camel_case(field.field_name), field) for field in self._readable_fields]
+            return self._camel_case_fields
+
     def to_representation(self, instance):
-        data = super(serializers.ModelSerializer, self).to_representation(instance)
-        return {camel_case(key): value for key, value in data.items()}
+        data = {}
+        for key, field in self.camel_case_fields():
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+
+            # Igual que Serializer.to_representation: no se representa un valor nulo
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            data[key] = None if check_for_none is None else field.to_representation(attribute)
+        return data
+
+
+class ValuesSerializer:
+    """
+    Serializador de solo lectura para listas grandes. En lugar de crear una
+    instancia del modelo y un árbol de campos de DRF por renglón, consulta con
+    .values_list() solo las columnas necesarias y arma diccionarios con las
+    claves en camelCase ya calculadas.
+
+    `fields` mapea cada campo de salida (en snake_case) a:
+    - el lookup de la columna, si el valor se copia tal cual;
+    - una tupla (lookup o tupla de lookups, función) que convierte el valor;
+    - un diccionario con la misma forma, para objetos anidados.
+    """
+    fields: dict[str, Any] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.lookups: list[str] = []
+        cls.compiled = cls.compile(cls.fields)
+        cls.columns = [key for key, _, _ in cls.compiled]
+
+    @classmethod
+    def compile(cls, fields: dict[str, Any]) -> list[tuple[str, Any, Callable | None]]:
+        """Convierte `fields` en (clave camelCase, posiciones o campos anidados, función)."""
+        compiled = []
+        for name, spec in fields.items():
+            if isinstance(spec, dict):
+                compiled.append((camel_case(name), cls.compile(spec), None))
+                continue
+
+            lookups, converter = spec if isinstance(spec, tuple) else (spec, None)
+            if isinstance(lookups, str):
+                lookups = (lookups,)
+            positions = []
+            for lookup in lookups:
+                if lookup not in cls.lookups:
+                    cls.lookups.append(lookup)
+                positions.append(cls.lookups.index(lookup))
+            compiled.append((camel_case(name), tuple(positions), converter))
+        return compiled
+
+    @classmethod
+    def build(cls, compiled: list[tuple[str, Any, Callable | None]], row: tuple) -> dict[str, Any]:
+        data = {}
+        for key, positions, converter in compiled:
+            if isinstance(positions, list):
+                data[key] = cls.build(positions, row)
+            elif converter is None:
+                data[key] = row[positions[0]]
+            else:
+                data[key] = converter(*(row[position] for position in positions))
+        return data
+
+    @classmethod
+    def build_row(cls, row: tuple) -> list[Any]:
+        """Renglón posicional: los valores en el orden de `columns`."""
+        return list(cls.build(cls.compiled, row).values())
+
+    @classmethod
+    def serialize(cls, queryset: QuerySet, positional: bool = False) -> list[dict[str, Any]] | dict[str, Any]:
+        """
+        Lista de diccionarios, o con `positional` un solo objeto con las claves
+        en "columns" y los valores de cada tarea en "rows", sin repetir claves.
+        """
+        rows = queryset.values_list(*cls.lookups)
+        if positional:
+            return cls.with_columns([cls.build_row(row) for row in rows])
+
+        compiled = cls.compiled
+        return [cls.build(compiled, row) for row in rows]
+
+    @classmethod
+    def with_columns(cls, rows: list[list[Any]]) -> dict[str, Any]:
+        return {"columns": cls.columns, "rows": rows}
+
+    @classmethod
+    def iterate(cls, queryset: QuerySet, chunk_size: int) -> Iterator[dict[str, Any]]:
+        """Como serialize, pero sin cargar (ni guardar en el queryset) todos los renglones a la vez."""
+        compiled = cls.compiled
+        for row in queryset.values_list(*cls.lookups).iterator(chunk_size=chunk_size):
+            yield cls.build(compiled, row)
+
+    @classmethod
+    def serialize_with(cls, queryset: QuerySet, *extra: str,
+                       positional: bool = False) -> Iterator[tuple[dict[str, Any] | list[Any], tuple]]:
+        """Como serialize, pero también regresa los valores de otras columnas de cada renglón (p. ej. para agrupar)."""
+        compiled = cls.compiled
+        count = len(cls.lookups)
+        for row in queryset.values_list(*cls.lookups, *extra):
+            yield cls.build_row(row) if positional else cls.build(compiled, row), row[count:]
+
+
+def full_name(first_names: str, last_names: str | None) -> str | None:
+    if first_names is None:
+        return None
+    return f"{first_names} {last_names}"
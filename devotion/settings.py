@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 import os
 import sys
+from importlib.util import find_spec
 from pathlib import Path
 from datetime import timedelta
 
@@ -99,6 +100,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'devotion.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -159,6 +161,66 @@ else:
         }
     }
 
+# Caché
+# Con varios workers de gunicorn se necesita un caché compartido (Redis) para que
+# las invalidaciones lleguen a todos. Sin REDIS_URL no se guarda nada en caché:
+# un caché en memoria por proceso serviría datos viejos en los demás workers.
+# Las pruebas corren en un solo proceso, así que usan un caché en memoria.
+
+try:
+    REDIS_URL = env_variable("REDIS_URL")
+except (KeyError, FileNotFoundError):
+    REDIS_URL = None
+
+if "test" in sys.argv or "test_coverage" in sys.argv:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }
+    }
+elif REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+        }
+    }
+
+BREADCRUMBS_CACHE_TIMEOUT = 60 * 60 * 24
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+
+# Hilos con los que el dashboard consulta en paralelo los datos de sus métricas,
+# cada uno con su propia conexión a la base de datos. Con 0 se consultan en serie.
+
+try:
+    DASHBOARD_WORKERS = int(env_variable("DASHBOARD_WORKERS"))
+except (KeyError, FileNotFoundError, ValueError):
+    DASHBOARD_WORKERS = 0
+
+# Renglones que se leen de la base de datos (y se escriben) por bloque en las
+# respuestas en streaming (`?stream=true`).
+
+STREAM_CHUNK_SIZE = 2000
+
+# Tamaño mínimo (en bytes) de una respuesta para comprimirla con gzip o brotli;
+# debajo de esto comprimir cuesta más de lo que ahorra.
+
+try:
+    COMPRESSION_MIN_SIZE = int(env_variable("COMPRESSION_MIN_SIZE"))
+except (KeyError, FileNotFoundError, ValueError):
+    COMPRESSION_MIN_SIZE = 1024
+
+# Motor para obtener subárboles de proyectos y tareas: "closure" usa las tablas
+# de cierre, "recursive" usa WITH RECURSIVE / CONNECT BY sobre las llaves papá.
+
+SUBTREE_ENGINE = "closure"
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -183,6 +245,12 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'devotion.auth.GoogleJWTAuthentication',
     ),
+    # MessagePack solo se usa si el cliente lo pide en el header Accept
+    'DEFAULT_RENDERER_CLASSES': (
+        'devotion.renderers.FastJSONRenderer',
+        *(('devotion.renderers.MessagePackRenderer',) if find_spec("msgpack") else ()),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SIMPLE_JWT = {
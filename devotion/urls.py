@@ -42,6 +42,7 @@ urlpatterns = [
     path("tasks/", tasks.create_task),
     path("tasks/<uuid:task_id>/", tasks.TaskView.as_view()),
     path("tasks/<uuid:task_id>/status/", tasks.update_task_status),
+    path("tasks/<uuid:task_id>/subtree/", tasks.get_all_subtree_tasks),
 
     path("invites/", invites.create_invite),
     path("invites/<uuid:invite_id>/", invites.get_invite),
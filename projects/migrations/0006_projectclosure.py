@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from devotion.hierarchy import rebuild_closure
+
+
+def populate_closure(apps, _schema_editor):
+    Project = apps.get_model("projects", "Project")
+    ProjectClosure = apps.get_model("projects", "ProjectClosure")
+    rebuild_closure(ProjectClosure, dict(Project.objects.values_list("id", "parent_id")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_alter_project_widget_config'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='projects.project')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='projects.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_project_closure')],
+            },
+        ),
+        migrations.RunPython(populate_closure, migrations.RunPython.noop),
+    ]
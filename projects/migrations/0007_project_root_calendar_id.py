@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+def populate_root_calendar_id(apps, _schema_editor):
+    Project = apps.get_model("projects", "Project")
+    projects = {
+        project_id: (parent_id, calendar_id)
+        for project_id, parent_id, calendar_id in Project.objects.values_list("id", "parent_id", "calendar_id")
+    }
+
+    for project_id in projects:
+        ancestor_id = project_id
+        calendar_id = None
+        while ancestor_id is not None and calendar_id is None:
+            ancestor_id, calendar_id = projects[ancestor_id]
+        Project.objects.filter(id=project_id).update(root_calendar_id=calendar_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_projectclosure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='root_calendar_id',
+            field=models.CharField(blank=True, max_length=128, null=True),
+        ),
+        migrations.RunPython(populate_root_calendar_id, migrations.RunPython.noop),
+    ]
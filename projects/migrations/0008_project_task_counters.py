@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:37
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_task_counters(apps, _schema_editor):
+    Project = apps.get_model("projects", "Project")
+    Task = apps.get_model("tasks", "Task")
+    counts = Task.objects.filter(parent_project_id=OuterRef("id")).values("parent_project_id")
+    Project.objects.update(
+        total_tasks=Coalesce(Subquery(counts.annotate(c=Count("id")).values("c")), 0),
+        done_tasks=Coalesce(Subquery(counts.annotate(c=Count("id", filter=Q(status=3))).values("c")), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_project_root_calendar_id'),
+        ('tasks', '0004_task_root_calendar_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='done_tasks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='total_tasks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_task_counters, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='project',
+            name='progress',
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:37
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+
+
+def populate_subtree_counters(apps, _schema_editor):
+    Project = apps.get_model("projects", "Project")
+    ProjectClosure = apps.get_model("projects", "ProjectClosure")
+    sums = ProjectClosure.objects.filter(ancestor_id=OuterRef("id")).values("ancestor_id")
+    Project.objects.update(
+        subtree_total_tasks=Subquery(sums.annotate(s=Sum("descendant__total_tasks")).values("s")),
+        subtree_done_tasks=Subquery(sums.annotate(s=Sum("descendant__done_tasks")).values("s"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_project_task_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='subtree_done_tasks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='subtree_total_tasks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_subtree_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:44
+
+from django.db import migrations, models
+from django.db.models import F
+
+# Configuraciones con 8 métricas en base 8; status_history y progress_history
+# se agregan como dígitos 9 y 10 con el tipo LINE (4)
+OLD_METRICS = 8
+HISTORY_WIDGETS = 4 * 8 ** 8 + 4 * 8 ** 9
+
+
+def add_history_widgets(apps, _schema_editor):
+    Project = apps.get_model("projects", "Project")
+    Project.objects.filter(widget_config__lt=8 ** OLD_METRICS).update(
+        widget_config=F("widget_config") + HISTORY_WIDGETS)
+
+
+def remove_history_widgets(apps, _schema_editor):
+    Project = apps.get_model("projects", "Project")
+    Project.objects.filter(widget_config__gte=8 ** OLD_METRICS).update(
+        widget_config=F("widget_config") % 8 ** OLD_METRICS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_project_subtree_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='project',
+            name='widget_config',
+            field=models.IntegerField(default=620537088),
+        ),
+        migrations.RunPython(add_history_widgets, remove_history_widgets),
+    ]
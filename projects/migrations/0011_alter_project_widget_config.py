@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:46
+
+from django.db import migrations, models
+from django.db.models import F
+
+# Antes de lead_time y cycle_time había 10 métricas en base 8, que caben en un IntegerField
+OLD_METRICS = 10
+
+
+def remove_completion_widgets(apps, _schema_editor):
+    # Al revertir, los dígitos de lead_time y cycle_time no caben en 32 bits y se descartan
+    Project = apps.get_model("projects", "Project")
+    Project.objects.filter(widget_config__gte=8 ** OLD_METRICS).update(
+        widget_config=F("widget_config") % 8 ** OLD_METRICS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_history_widget_config'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='project',
+            name='widget_config',
+            field=models.BigIntegerField(default=620537088),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, remove_completion_widgets),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+# Con BURNDOWN y CUMULATIVE_FLOW hay 10 tipos de widget, así que las
+# configuraciones pasan de base 8 a base 10 y se agrega task_flow (BURNDOWN)
+OLD_BASE, NEW_BASE = 8, 10
+OLD_METRICS = 12
+TASK_FLOW_DEFAULT = 8
+
+
+def rebase(number: int, old_base: int, new_base: int, metrics: int) -> int:
+    result = 0
+    for exponent in range(metrics):
+        result += (number % old_base) * new_base ** exponent
+        number //= old_base
+    return result
+
+
+def to_base_10(apps, _schema_editor):
+    Project = apps.get_model("projects", "Project")
+    projects = list(Project.objects.only("id", "widget_config"))
+    for project in projects:
+        project.widget_config = rebase(project.widget_config, OLD_BASE, NEW_BASE, OLD_METRICS) \
+            + TASK_FLOW_DEFAULT * NEW_BASE ** OLD_METRICS
+    Project.objects.bulk_update(projects, ["widget_config"], batch_size=500)
+
+
+def to_base_8(apps, _schema_editor):
+    Project = apps.get_model("projects", "Project")
+    projects = list(Project.objects.only("id", "widget_config"))
+    for project in projects:
+        # Los tipos nuevos no existen en base 8; se regresan a NUMBER
+        digits = [(project.widget_config // NEW_BASE ** i) % NEW_BASE for i in range(OLD_METRICS)]
+        project.widget_config = sum(
+            (digit if digit < OLD_BASE else 0) * OLD_BASE ** i for i, digit in enumerate(digits))
+    Project.objects.bulk_update(projects, ["widget_config"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_alter_project_widget_config'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='project',
+            name='widget_config',
+            field=models.BigIntegerField(default=8004477122400),
+        ),
+        migrations.RunPython(to_base_10, to_base_8),
+    ]
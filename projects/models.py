@@ -1,6 +1,11 @@
 import uuid
-from django.db import models
+from django.apps import apps
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
 from dashboards.metrics import project_metrics, WidgetType
+from devotion.hierarchy import insert_node, move_subtree, breadcrumbs_cache_key
+from devotion.models import TrackedModel
 
 INT_BASE = len(WidgetType)
 
@@ -37,14 +42,19 @@ DEFAULT_WIDGET_CONFIG = {
     "tasks_by_priority": WidgetType.VERTICAL_BAR,
     "user_workload": WidgetType.NUMBERS,
     "project_progress": WidgetType.GAUGE,
-    "all_project_progress": WidgetType.GAUGE
+    "all_project_progress": WidgetType.GAUGE,
+    "status_history": WidgetType.LINE,
+    "progress_history": WidgetType.LINE,
+    "lead_time": WidgetType.NUMBER,
+    "cycle_time": WidgetType.NUMBER,
+    "task_flow": WidgetType.BURNDOWN
 }
 
 assert len(DEFAULT_WIDGET_CONFIG) == len(project_metrics()), "La configuración de widgets no coincide con las métricas."
 DEFAULT_WIDGET_CONFIG = get_config_number(DEFAULT_WIDGET_CONFIG)
 
 
-class Project(models.Model):
+class Project(TrackedModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=64, null=False, blank=False)
     description = models.TextField(max_length=1024, null=True, blank=True)
@@ -52,9 +62,153 @@ class Project(models.Model):
         "self", on_delete=models.CASCADE, null=True, blank=True, related_name="projects")
     leaders = models.ManyToManyField("users.User", related_name="leader_of")
     members = models.ManyToManyField("users.User", related_name="member_of")
-    progress = models.FloatField(default=0, null=False, blank=False)
-    widget_config = models.IntegerField(default=DEFAULT_WIDGET_CONFIG, null=False, blank=False)
+    total_tasks = models.PositiveIntegerField(default=0, null=False, blank=False)
+    done_tasks = models.PositiveIntegerField(default=0, null=False, blank=False)
+    # Igual que los anteriores, pero acumulando todos los subproyectos
+    subtree_total_tasks = models.PositiveIntegerField(default=0, null=False, blank=False)
+    subtree_done_tasks = models.PositiveIntegerField(default=0, null=False, blank=False)
+    widget_config = models.BigIntegerField(default=DEFAULT_WIDGET_CONFIG, null=False, blank=False)
     calendar_id = models.CharField(max_length=128, null=True, blank=True)
+    # Calendario del ancestro más cercano (o el propio) que tiene uno; normalmente el del proyecto raíz
+    root_calendar_id = models.CharField(max_length=128, null=True, blank=True)
+
+    tracked_fields = ("parent_id", "name", "calendar_id")
+    # Solo se modifican con actualizaciones atómicas, nunca al guardar la instancia
+    counter_fields = ("total_tasks", "done_tasks", "subtree_total_tasks", "subtree_done_tasks")
+
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        parent_changed = not is_new and self.has_changed("parent_id")
+        calendar_changed = not is_new and self.has_changed("calendar_id")
+
+        if is_new or parent_changed or calendar_changed:
+            self.root_calendar_id = self.calendar_id or (
+                self.parent.root_calendar_id if self.parent_id else None)
+
+        if not is_new and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                insert_node(ProjectClosure, self.id, self.parent_id)
+            elif parent_changed:
+                subtree_total, subtree_done = Project.objects.select_for_update().filter(
+                    id=self.id).values_list("subtree_total_tasks", "subtree_done_tasks").get()
+                old_parent_id = self.loaded_value("parent_id")
+                if old_parent_id is not None:
+                    add_subtree_counts(old_parent_id, total=-subtree_total, done=-subtree_done)
+                move_subtree(ProjectClosure, self.id, self.parent_id)
+                if self.parent_id is not None:
+                    add_subtree_counts(self.parent_id, total=subtree_total, done=subtree_done)
+            if parent_changed or calendar_changed:
+                self.propagate_calendar()
+
+        if parent_changed or (not is_new and self.has_changed("name")):
+            self.invalidate_breadcrumbs()
+
+        self.remember_loaded_values()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if self.parent_id is not None:
+                subtree_total, subtree_done = Project.objects.select_for_update().filter(
+                    id=self.id).values_list("subtree_total_tasks", "subtree_done_tasks").get()
+                add_subtree_counts(self.parent_id, total=-subtree_total, done=-subtree_done)
+            return super().delete(*args, **kwargs)
+
+    @property
+    def progress(self) -> float:
+        """Porcentaje de tareas completadas del proyecto."""
+        if self.total_tasks == 0:
+            return 0
+        return self.done_tasks * 100 / self.total_tasks
+
+    @property
+    def subtree_progress(self) -> float:
+        """Porcentaje de tareas completadas del proyecto y todos sus subproyectos."""
+        if self.subtree_total_tasks == 0:
+            return 0
+        return self.subtree_done_tasks * 100 / self.subtree_total_tasks
+
+    def propagate_calendar(self) -> None:
+        """Actualiza el calendario heredado de todos los proyectos y tareas debajo de este proyecto."""
+        Task = apps.get_model("tasks", "Task")
+        subtree_ids = ProjectClosure.objects.filter(ancestor_id=self.id).values("descendant_id")
+        inherited_calendar_id = self.calendar_id or (self.parent.root_calendar_id if self.parent_id else None)
+        calendars = {project_id: inherited_calendar_id for project_id in subtree_ids.values_list("descendant_id", flat=True)}
+
+        # Los subproyectos con calendario propio se lo heredan a su propio subárbol
+        calendar_owners = ProjectClosure.objects.filter(
+            descendant_id__in=subtree_ids,
+            ancestor_id__in=subtree_ids,
+            ancestor__calendar_id__isnull=False
+        ).order_by("-depth").values_list("descendant_id", "ancestor__calendar_id")
+        for project_id, calendar_id in calendar_owners:
+            calendars[project_id] = calendar_id
+
+        project_ids_by_calendar = {}
+        for project_id, calendar_id in calendars.items():
+            project_ids_by_calendar.setdefault(calendar_id, []).append(project_id)
+
+        for calendar_id, project_ids in project_ids_by_calendar.items():
+            Project.objects.filter(id__in=project_ids).update(root_calendar_id=calendar_id)
+            Task.objects.filter(parent_project_id__in=project_ids).update(root_calendar_id=calendar_id)
+
+    def invalidate_breadcrumbs(self) -> None:
+        """Descarta las migajas en caché de todos los proyectos y tareas debajo de este proyecto."""
+        Task = apps.get_model("tasks", "Task")
+        project_ids = ProjectClosure.objects.filter(ancestor_id=self.id).values_list("descendant_id", flat=True)
+        task_ids = Task.objects.filter(parent_project__ancestor_links__ancestor_id=self.id).values_list("id", flat=True)
+        cache.delete_many(
+            [breadcrumbs_cache_key("project", project_id) for project_id in project_ids] +
+            [breadcrumbs_cache_key("task", task_id) for task_id in task_ids]
+        )
 
     def __str__(self):
         return self.name
+
+
+def add_task_counts(project_id: uuid.UUID | str, total: int = 0, done: int = 0) -> None:
+    """
+    Suma (o resta) a los contadores de tareas de un proyecto y, en la misma
+    actualización atómica, a los contadores de subárbol de todos sus ancestros.
+    """
+    if not total and not done:
+        return
+
+    def own(delta: int) -> Case:
+        return Case(When(id=project_id, then=Value(delta)), default=Value(0))
+
+    Project.objects.filter(descendant_links__descendant_id=project_id).update(
+        total_tasks=F("total_tasks") + own(total),
+        done_tasks=F("done_tasks") + own(done),
+        subtree_total_tasks=F("subtree_total_tasks") + total,
+        subtree_done_tasks=F("subtree_done_tasks") + done
+    )
+
+
+def add_subtree_counts(project_id: uuid.UUID | str, total: int = 0, done: int = 0) -> None:
+    """Suma (o resta) a los contadores de subárbol de un proyecto y todos sus ancestros."""
+    if not total and not done:
+        return
+
+    Project.objects.filter(descendant_links__descendant_id=project_id).update(
+        subtree_total_tasks=F("subtree_total_tasks") + total,
+        subtree_done_tasks=F("subtree_done_tasks") + done
+    )
+
+
+class ProjectClosure(models.Model):
+    """Tabla de cierre de la jerarquía de proyectos: un registro por cada par ancestro/descendiente."""
+    ancestor = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="descendant_links")
+    descendant = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="ancestor_links")
+    depth = models.PositiveSmallIntegerField(null=False, blank=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=("ancestor", "descendant"), name="unique_project_closure")
+        ]
@@ -1,9 +1,11 @@
 from rest_framework import serializers
 
+from dashboards.cache import invalidate_dashboards
 from devotion.apis import create_calendar, update_calendar
+from devotion.hierarchy import is_descendant
 from devotion.serializers import CCModelSerializer
 from users.models import User
-from .models import Project, DEFAULT_WIDGET_CONFIG
+from .models import Project, ProjectClosure, DEFAULT_WIDGET_CONFIG
 
 
 def get_project_or_error(project_id: str) -> Project:
@@ -65,17 +67,17 @@ class ProjectDeserializer(serializers.Serializer):
         project = Project.objects.create(
             name=validated_data["name"],
             description=validated_data.get("description"),
+            parent_id=validated_data.get("parent"),
             widget_config=DEFAULT_WIDGET_CONFIG
         )
 
         project.leaders.set(validated_data["leaders"])
         project.members.set(validated_data["members"])
 
-        if "parent" in validated_data:
-            project.parent_id = validated_data["parent"]
-            project.save()
-        else:
+        if "parent" not in validated_data:
             create_calendar(project)
+        else:
+            invalidate_dashboards(project.parent_id)
 
         return project
 
@@ -101,6 +103,8 @@ class ProjectUpdateDeserializer(ProjectDeserializer):
             parent = get_project_or_error(parent_id)
             if str(self.instance.id) == str(parent_id):
                 raise serializers.ValidationError("Un proyecto no puede ser su propio papá.")
+            if is_descendant(ProjectClosure, parent.id, self.instance.id):
+                raise serializers.ValidationError("Un proyecto no puede ser hijo de uno de sus subproyectos.")
             parent_members = set(map(lambda m: str(m.id), parent.members.all()))
             check_members_are_subset(members, parent_members)
         else:
@@ -114,13 +118,20 @@ class ProjectUpdateDeserializer(ProjectDeserializer):
         return attrs
 
     def update(self, instance, validated_data):
+        old_parent_id = instance.parent_id
+
         for attr, value in validated_data.items():
             if attr in ("leaders", "members"):
                 getattr(instance, attr).set(value)
+            elif attr == "parent":
+                instance.parent_id = value
             else:
                 setattr(instance, attr, value)
 
         instance.save()
+        invalidate_dashboards(instance.id)
+        if str(old_parent_id) != str(instance.parent_id):
+            invalidate_dashboards(old_parent_id)
 
         if not self.context["is_subproject"]:
             update_calendar(
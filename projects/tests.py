@@ -1,3 +1,226 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from devotion.apis import get_calendar_id
+from users.models import User
+from tasks.models import Task
+from tasks.subtasks import get_all_subtree
+from tasks.views import get_task_breadcrumbs
+from .models import Project, ProjectClosure
+from .views import get_project_breadcrumbs
 
-# Create your tests here.
+
+class HierarchyTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.checo = User.objects.create(
+            email="sergioperez@devotion.com",
+            first_names="Sergio",
+            last_names="Pérez"
+        )
+        self.fsae = Project.objects.create(name="FSAE 2024")
+        self.chasis = Project.objects.create(name="Chasis", parent=self.fsae)
+        self.suspension = Project.objects.create(name="Suspensión", parent=self.chasis)
+        self.motor = Project.objects.create(name="Motor", parent=self.fsae)
+        for project in (self.fsae, self.chasis, self.suspension, self.motor):
+            project.leaders.set([self.checo])
+            project.members.set([self.checo])
+
+    def create_task(self, name: str, project: Project, parent_task: Task | None = None) -> Task:
+        return Task.objects.create(
+            name=name,
+            start_date="2024-01-01",
+            due_date="2024-01-01",
+            parent_project=project,
+            parent_task=parent_task,
+            assignee=self.checo,
+            status=Task.Status.NOT_STARTED,
+            priority=Task.Priority.MEDIUM,
+        )
+
+    def test_project_closure(self):
+        ancestors = ProjectClosure.objects.filter(descendant=self.suspension).order_by("-depth")
+        self.assertEqual(
+            list(ancestors.values_list("ancestor_id", "depth")),
+            [(self.fsae.id, 2), (self.chasis.id, 1), (self.suspension.id, 0)]
+        )
+
+        # Mover "Chasis" debajo de "Motor" arrastra a "Suspensión"
+        self.chasis.parent = self.motor
+        self.chasis.save()
+        ancestors = ProjectClosure.objects.filter(descendant=self.suspension).order_by("-depth")
+        self.assertEqual(
+            list(ancestors.values_list("ancestor_id", "depth")),
+            [(self.fsae.id, 3), (self.motor.id, 2), (self.chasis.id, 1), (self.suspension.id, 0)]
+        )
+
+        self.chasis.delete()
+        self.assertFalse(ProjectClosure.objects.filter(descendant_id=self.suspension.id).exists())
+
+    def test_subtree(self):
+        root_task = self.create_task("Tarea raíz", self.fsae)
+        subtask = self.create_task("Subtarea", self.fsae, root_task)
+        subsubtask = self.create_task("Subsubtarea", self.fsae, subtask)
+        suspension_task = self.create_task("Amortiguadores", self.suspension)
+        motor_task = self.create_task("Pistones", self.motor)
+
+        self.assertEqual(
+            set(get_all_subtree(self.fsae)),
+            {root_task, subtask, subsubtask, suspension_task, motor_task}
+        )
+        self.assertEqual(set(get_all_subtree(self.chasis)), {suspension_task})
+        self.assertEqual(set(get_all_subtree(root_task)), {subtask, subsubtask})
+
+        # Reasignar la subtarea la saca del subárbol de la tarea raíz
+        subtask.parent_task = None
+        subtask.save()
+        self.assertEqual(set(get_all_subtree(root_task)), set())
+        self.assertEqual(set(get_all_subtree(subtask)), {subsubtask})
+
+    def test_recursive_engine(self):
+        root_task = self.create_task("Tarea raíz", self.fsae)
+        subtask = self.create_task("Subtarea", self.fsae, root_task)
+        subsubtask = self.create_task("Subsubtarea", self.fsae, subtask)
+        suspension_task = self.create_task("Amortiguadores", self.suspension)
+
+        with override_settings(SUBTREE_ENGINE="recursive"):
+            self.assertEqual(
+                set(get_all_subtree(self.fsae)),
+                {root_task, subtask, subsubtask, suspension_task}
+            )
+            self.assertEqual(set(get_all_subtree(self.chasis)), {suspension_task})
+            self.assertEqual(set(get_all_subtree(root_task, self.checo.id)), {subtask, subsubtask})
+            self.assertEqual(get_all_subtree(root_task).filter(name="Subsubtarea").get(), subsubtask)
+
+        response = self.client.get(f"/tasks/{root_task.id}/subtree/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({task["id"] for task in response.data}, {str(subtask.id), str(subsubtask.id)})
+
+    def test_breadcrumbs(self):
+        root_task = self.create_task("Tarea raíz", self.suspension)
+        subtask = self.create_task("Subtarea", self.suspension, root_task)
+
+        with self.assertNumQueries(1):
+            breadcrumbs = get_task_breadcrumbs(subtask)
+        self.assertEqual(breadcrumbs, [
+            (self.fsae.id, "FSAE 2024", False),
+            (self.chasis.id, "Chasis", False),
+            (self.suspension.id, "Suspensión", False),
+            (self.suspension.id, "Tareas", False),
+            (root_task.id, "Tarea raíz", True),
+            (subtask.id, "Subtarea", True),
+        ])
+
+        # La segunda vez sale del caché
+        get_project_breadcrumbs(self.suspension)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_task_breadcrumbs(subtask), breadcrumbs)
+            self.assertEqual(len(get_project_breadcrumbs(self.suspension)), 3)
+
+        # Renombrar o mover un ancestro invalida las migajas de todo su subárbol
+        self.chasis.name = "Chasis tubular"
+        self.chasis.save()
+        self.assertEqual(get_task_breadcrumbs(subtask)[1], (self.chasis.id, "Chasis tubular", False))
+        self.assertEqual(get_project_breadcrumbs(self.suspension)[1], (self.chasis.id, "Chasis tubular", False))
+
+        self.suspension.parent = self.fsae
+        self.suspension.save()
+        self.assertEqual(len(get_project_breadcrumbs(self.suspension)), 2)
+        self.assertEqual(len(get_task_breadcrumbs(subtask)), 5)
+
+    def test_root_calendar(self):
+        suspension_task = self.create_task("Amortiguadores", self.suspension)
+        self.assertIsNone(suspension_task.root_calendar_id)
+
+        self.fsae.calendar_id = "fsae@group.calendar.google.com"
+        self.fsae.save()
+        suspension_task.refresh_from_db()
+        self.assertEqual(suspension_task.root_calendar_id, "fsae@group.calendar.google.com")
+
+        self.suspension.refresh_from_db()
+        new_task = self.create_task("Resortes", self.suspension)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_calendar_id(new_task), "fsae@group.calendar.google.com")
+
+        # Mover el subárbol a otra raíz cambia el calendario heredado
+        baja = Project.objects.create(name="Baja SAE", calendar_id="baja@group.calendar.google.com")
+        self.chasis.parent = baja
+        self.chasis.save()
+        self.suspension.refresh_from_db()
+        suspension_task.refresh_from_db()
+        self.assertEqual(self.suspension.root_calendar_id, "baja@group.calendar.google.com")
+        self.assertEqual(suspension_task.root_calendar_id, "baja@group.calendar.google.com")
+        self.motor.refresh_from_db()
+        self.assertEqual(self.motor.root_calendar_id, "fsae@group.calendar.google.com")
+
+    def test_progress_rollup(self):
+        def counters(project: Project) -> tuple[int, int, int, int]:
+            project.refresh_from_db()
+            return (project.total_tasks, project.done_tasks,
+                    project.subtree_total_tasks, project.subtree_done_tasks)
+
+        self.create_task("Chasis", self.chasis)
+        suspension_task = self.create_task("Amortiguadores", self.suspension)
+        self.create_task("Pistones", self.motor)
+        suspension_task.status = Task.Status.DONE
+        suspension_task.save()
+
+        self.assertEqual(counters(self.fsae), (0, 0, 3, 1))
+        self.assertEqual(counters(self.chasis), (1, 0, 2, 1))
+        self.assertEqual(counters(self.suspension), (1, 1, 1, 1))
+
+        # Guardar un proyecto desactualizado no pisa los contadores
+        stale_fsae = Project.objects.get(id=self.fsae.id)
+        self.create_task("Reglamento", self.fsae)
+        stale_fsae.description = "Formula SAE"
+        stale_fsae.save()
+        self.assertEqual(counters(self.fsae), (1, 0, 4, 1))
+
+        # Mover "Suspensión" debajo de "Motor" mueve sus tareas en el acumulado
+        self.suspension.parent = self.motor
+        self.suspension.save()
+        self.assertEqual(counters(self.chasis), (1, 0, 1, 0))
+        self.assertEqual(counters(self.motor), (1, 0, 2, 1))
+        self.assertEqual(counters(self.fsae), (1, 0, 4, 1))
+
+        self.motor.delete()
+        self.assertEqual(counters(self.fsae), (1, 0, 2, 0))
+
+        response = self.client.get(f"/projects/{self.chasis.id}/dashboard/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["allProjectProgress"]["data"], [{"name": "Chasis", "value": 0}])
+
+    def test_cycle(self):
+        self.client.force_authenticate(self.checo)
+        response = self.client.put(
+            f"/projects/{self.fsae.id}/",
+            {"parent": self.suspension.id}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.fsae.refresh_from_db()
+        self.assertIsNone(self.fsae.parent_id)
+
+    def test_project_view_queries(self):
+        for size in (1, 5, 20):
+            with self.subTest(size=size):
+                project = Project.objects.create(name=f"Proyecto {size}", parent=self.fsae)
+                users = [
+                    User.objects.create(email=f"{size}.{i}@devotion.com", first_names="Piloto", last_names=str(i))
+                    for i in range(size)
+                ]
+                project.leaders.set([self.checo, users[0]])
+                project.members.set([self.checo, *users])
+                for i in range(size):
+                    Project.objects.create(name=f"Subproyecto {i}", parent=project)
+                    self.create_task(f"Tarea {i}", project)
+                cache.clear()
+
+                # Proyecto, líderes, miembros, ruta, subproyectos y tareas
+                with self.assertNumQueries(6):
+                    response = self.client.get(f"/projects/{project.id}/")
+                self.assertEqual(len(response.data["leaders"]), 2)
+                self.assertTrue(all(user["isLeader"] for user in response.data["leaders"]))
+                self.assertEqual(len(response.data["members"]), size - 1)
+                self.assertFalse(any(user["isLeader"] for user in response.data["members"]))
+                self.assertEqual(len(response.data["projects"]), size)
+                self.assertEqual(len(response.data["tasks"]), size)
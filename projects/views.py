@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -5,10 +7,12 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from dashboards.cache import invalidate_dashboards
 from devotion.apis import delete_calendar, GoogleAPIException
+from devotion.hierarchy import breadcrumbs_cache_key
 from users.serializers import UserRoleSerializer
-from tasks.subtasks import handle_subtasks_response
-from .models import Project
+from tasks.subtasks import CalendarBadRequest, handle_subtasks_response, stream_subtasks_response
+from .models import Project, ProjectClosure
 from .serializers import ProjectSerializer, SubprojectSerializer, ProjectDeserializer, ProjectUpdateDeserializer
 
 
@@ -44,13 +48,19 @@ def create_project(request: Request) -> Response:
 
 
 def get_project_breadcrumbs(project: Project) -> list[tuple[str, str, bool]]:
-    breadcrumbs = [(project.id, project.name, False)]
-    project = project.parent
-    while project is not None:
-        breadcrumbs.append((project.id, project.name, False))
-        project = project.parent
-
-    breadcrumbs.reverse()
+    """Obtiene la ruta de proyectos desde la raíz en una sola consulta, o desde el caché."""
+    cache_key = breadcrumbs_cache_key("project", project.id)
+    breadcrumbs = cache.get(cache_key)
+    if breadcrumbs is not None:
+        return breadcrumbs
+
+    ancestors = ProjectClosure.objects.filter(descendant_id=project.id).order_by("-depth")
+    breadcrumbs = [
+        (ancestor_id, ancestor_name, False)
+        for ancestor_id, ancestor_name in ancestors.values_list("ancestor_id", "ancestor__name")
+    ]
+
+    cache.set(cache_key, breadcrumbs, settings.BREADCRUMBS_CACHE_TIMEOUT)
     return breadcrumbs
 
 
@@ -71,20 +81,28 @@ class ProjectView(APIView):
         response = {}
 
         if response_fields in ("info", "all"):
-            project_context = {"project": project}
-            leaders = set(project.leaders.all())
-            members = set(project.members.all()) - leaders
+            # Un número fijo de consultas, sin importar cuántos miembros o subproyectos haya
+            leaders = list(project.leaders.all())
+            leader_ids = {leader.id for leader in leaders}
+            members = [member for member in project.members.all() if member.id not in leader_ids]
+            role_context = {"leader_ids": leader_ids}
             response = ProjectSerializer(project).data
             response.update({
                 "breadcrumbs": get_project_breadcrumbs(project),
                 "progress": project.progress,
-                "leaders": UserRoleSerializer(leaders, many=True, context=project_context).data,
-                "members": UserRoleSerializer(members, many=True, context=project_context).data,
+                "leaders": UserRoleSerializer(leaders, many=True, context=role_context).data,
+                "members": UserRoleSerializer(members, many=True, context=role_context).data,
                 "projects": SubprojectSerializer(project.projects.all(), many=True).data
             })
 
         if response_fields in ("tasks", "all"):
-            handle_subtasks_response(request, response, project)
+            streaming_response = stream_subtasks_response(request, response, project)
+            if streaming_response is not None:
+                return streaming_response
+            try:
+                handle_subtasks_response(request, response, project)
+            except CalendarBadRequest as e:
+                return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(response, status=status.HTTP_200_OK)
 
@@ -124,6 +142,7 @@ class ProjectView(APIView):
 
         calendar_id = project.calendar_id
         project.delete()
+        invalidate_dashboards(project.parent_id)
 
         if calendar_id:
             try:
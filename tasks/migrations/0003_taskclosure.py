@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from devotion.hierarchy import rebuild_closure
+
+
+def populate_closure(apps, _schema_editor):
+    Task = apps.get_model("tasks", "Task")
+    TaskClosure = apps.get_model("tasks", "TaskClosure")
+    rebuild_closure(TaskClosure, dict(Task.objects.values_list("id", "parent_task_id")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='tasks.task')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='tasks.task')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_task_closure')],
+            },
+        ),
+        migrations.RunPython(populate_closure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:36
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_root_calendar_id(apps, _schema_editor):
+    Project = apps.get_model("projects", "Project")
+    Task = apps.get_model("tasks", "Task")
+    Task.objects.update(root_calendar_id=Subquery(
+        Project.objects.filter(id=OuterRef("parent_project_id")).values("root_calendar_id")[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_project_root_calendar_id'),
+        ('tasks', '0003_taskclosure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='root_calendar_id',
+            field=models.CharField(blank=True, max_length=128, null=True),
+        ),
+        migrations.RunPython(populate_root_calendar_id, migrations.RunPython.noop),
+    ]
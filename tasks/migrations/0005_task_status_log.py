@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:46
+
+import datetime
+
+import django.db.models.deletion
+import django.utils.timezone
+import pytz
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_timestamps(apps, _schema_editor):
+    # No hay registro de cuándo se crearon o completaron las tareas existentes:
+    # se aproxima con su fecha de inicio y su fecha de entrega, a medianoche en
+    # la hora de México para que los dashboards las ubiquen en ese mismo día, y
+    # sin pasar de ahora (una tarea terminada antes de su entrega)
+    Task = apps.get_model("tasks", "Task")
+    local_timezone = pytz.timezone("Mexico/General")
+    now = django.utils.timezone.now()
+
+    def backfilled_timestamp(date: datetime.date) -> datetime.datetime:
+        return min(local_timezone.localize(datetime.datetime.combine(date, datetime.time.min)), now)
+
+    for start_date in Task.objects.values_list("start_date", flat=True).order_by().distinct():
+        Task.objects.filter(start_date=start_date).update(created_at=backfilled_timestamp(start_date))
+
+    done_tasks = Task.objects.filter(status=3)
+    for due_date in done_tasks.values_list("due_date", flat=True).order_by().distinct():
+        done_tasks.filter(due_date=due_date).update(completed_at=backfilled_timestamp(due_date))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_alter_project_widget_config'),
+        ('tasks', '0004_task_root_calendar_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.SmallIntegerField(blank=True, choices=[(0, 'Not started'), (1, 'In progress'), (2, 'In review'), (3, 'Done')], null=True)),
+                ('to_status', models.SmallIntegerField(choices=[(0, 'Not started'), (1, 'In progress'), (2, 'In review'), (3, 'Done')])),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['parent_project', 'completed_at'], name='task_project_completed_idx'),
+        ),
+        migrations.AddField(
+            model_name='taskstatuschange',
+            name='changed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='taskstatuschange',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.project'),
+        ),
+        migrations.AddField(
+            model_name='taskstatuschange',
+            name='task',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='tasks.task'),
+        ),
+        migrations.AddIndex(
+            model_name='taskstatuschange',
+            index=models.Index(fields=['task', 'to_status', 'changed_at'], name='status_change_task_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskstatuschange',
+            index=models.Index(fields=['project', 'changed_at'], name='status_change_project_idx'),
+        ),
+        migrations.RunPython(populate_timestamps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_widget_config_base_10'),
+        ('tasks', '0005_task_status_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['parent_project', 'due_date'], name='task_project_due_idx'),
+        ),
+    ]
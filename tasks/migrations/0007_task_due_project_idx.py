@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_widget_config_base_10'),
+        ('tasks', '0006_task_project_due_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['due_date', 'parent_project'], name='task_due_project_idx'),
+        ),
+    ]
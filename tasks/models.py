@@ -1,8 +1,16 @@
 import uuid
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from devotion.hierarchy import insert_node, move_subtree, breadcrumbs_cache_key
+from dashboards.models import (
+    DailyTaskKey, WeeklyTaskKey, add_daily_task_count, add_weekly_task_count, week_start)
+from devotion.models import TrackedModel
+from projects.models import add_task_counts
 
 
-class Task(models.Model):
+class Task(TrackedModel):
     class Status(models.IntegerChoices):
         NOT_STARTED = 0, "Not started"
         IN_PROGRESS = 1, "In progress"
@@ -28,6 +36,174 @@ class Task(models.Model):
     assignee = models.ForeignKey(
         "users.User", on_delete=models.CASCADE, null=False, blank=False, related_name="tasks")
     event_id = models.CharField(max_length=32, null=False, blank=False)
+    # Copia del calendario heredado por el proyecto papá, para sincronizar eventos sin subir por la jerarquía
+    root_calendar_id = models.CharField(max_length=128, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, null=False, blank=False)
+    # Momento en que la tarea pasó a completada (None si no lo está)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=("parent_project", "completed_at"), name="task_project_completed_idx"),
+            models.Index(fields=("parent_project", "due_date"), name="task_project_due_idx"),
+            # Calendario global: ventana de fechas sobre los proyectos del usuario
+            models.Index(fields=("due_date", "parent_project"), name="task_due_project_idx")
+        ]
+
+    tracked_fields = ("parent_task_id", "parent_project_id", "name")
+    breadcrumb_fields = ("parent_task_id", "parent_project_id", "name")
+
+    def save(self, *args, changed_by=None, **kwargs):
+        """`changed_by` es el usuario que queda registrado si cambia el estado."""
+        is_new = self._state.adding
+
+        if is_new or self.has_changed("parent_project_id"):
+            self.root_calendar_id = self.parent_project.root_calendar_id
+
+        with transaction.atomic():
+            if not is_new:
+                # Se leen los valores guardados con candado para que los contadores
+                # no se desfasen si dos requests cambian la misma tarea a la vez
+                stored = Task.objects.select_for_update().filter(id=self.id).values(
+                    "parent_project_id", "parent_task_id", "status", "start_date", "assignee_id").get()
+
+            old_status = None if is_new else stored["status"]
+            status_changed = old_status != self.status
+            if status_changed:
+                now = timezone.now()
+                self.completed_at = now if self.status == Task.Status.DONE else None
+                if "update_fields" in kwargs and kwargs["update_fields"] is not None:
+                    kwargs["update_fields"] = {*kwargs["update_fields"], "completed_at"}
+
+            super().save(*args, **kwargs)
+
+            if status_changed:
+                TaskStatusChange.objects.create(
+                    task=self, project_id=self.parent_project_id, from_status=old_status,
+                    to_status=self.status, changed_by=changed_by, changed_at=now)
+
+            is_done = int(self.status == Task.Status.DONE)
+            weekly_key = self.weekly_key(
+                self.parent_project_id, self.parent_task_id, self.start_date, self.assignee_id)
+            daily_key = self.daily_key(self.parent_project_id, self.parent_task_id, self.status)
+
+            if is_new:
+                insert_node(TaskClosure, self.id, self.parent_task_id)
+                add_task_counts(self.parent_project_id, total=1, done=is_done)
+                if weekly_key:
+                    add_weekly_task_count(weekly_key, 1)
+                if daily_key:
+                    add_daily_task_count(daily_key, 1)
+            else:
+                if self.has_changed("parent_task_id"):
+                    move_subtree(TaskClosure, self.id, self.parent_task_id)
+
+                was_done = int(stored["status"] == Task.Status.DONE)
+                if stored["parent_project_id"] != self.parent_project_id:
+                    add_task_counts(stored["parent_project_id"], total=-1, done=-was_done)
+                    add_task_counts(self.parent_project_id, total=1, done=is_done)
+                else:
+                    add_task_counts(self.parent_project_id, done=is_done - was_done)
+
+                stored_weekly_key = self.weekly_key(
+                    stored["parent_project_id"], stored["parent_task_id"], stored["start_date"],
+                    stored["assignee_id"])
+                if stored_weekly_key != weekly_key:
+                    if stored_weekly_key:
+                        add_weekly_task_count(stored_weekly_key, -1)
+                    if weekly_key:
+                        add_weekly_task_count(weekly_key, 1)
+
+                stored_daily_key = self.daily_key(
+                    stored["parent_project_id"], stored["parent_task_id"], stored["status"])
+                if stored_daily_key != daily_key:
+                    if stored_daily_key:
+                        add_daily_task_count(stored_daily_key, -1)
+                    if daily_key:
+                        add_daily_task_count(daily_key, 1)
+
+        if not is_new and any(map(self.has_changed, self.breadcrumb_fields)):
+            self.invalidate_breadcrumbs()
+
+        self.remember_loaded_values()
+
+    def delete(self, *args, **kwargs):
+        # Las subtareas se borran en cascada, así que también se descuentan
+        subtree_counts = Task.objects.filter(ancestor_links__ancestor_id=self.id).values(
+            "parent_project_id"
+        ).annotate(
+            total=Count("id"),
+            done=Count("id", filter=Q(status=Task.Status.DONE))
+        )
+
+        with transaction.atomic():
+            # Como en save, los registros a descontar salen de los valores guardados y no
+            # de esta instancia, que pudo haber quedado vieja
+            stored = Task.objects.select_for_update().filter(id=self.id).values(
+                "parent_project_id", "parent_task_id", "status", "start_date", "assignee_id").get()
+            weekly_key = self.weekly_key(
+                stored["parent_project_id"], stored["parent_task_id"], stored["start_date"], stored["assignee_id"])
+            daily_key = self.daily_key(stored["parent_project_id"], stored["parent_task_id"], stored["status"])
+
+            for counts in subtree_counts:
+                add_task_counts(counts["parent_project_id"], total=-counts["total"], done=-counts["done"])
+            if weekly_key:
+                add_weekly_task_count(weekly_key, -1)
+            if daily_key:
+                add_daily_task_count(daily_key, -1)
+            return super().delete(*args, **kwargs)
+
+    @classmethod
+    def weekly_key(cls, parent_project_id, parent_task_id, start_date, assignee_id) -> WeeklyTaskKey | None:
+        """Registro de WeeklyTaskCount en el que cuenta una tarea (solo cuentan las de primer nivel)."""
+        if parent_task_id is not None:
+            return None
+
+        to_uuid = cls._meta.pk.to_python
+        start_date = cls._meta.get_field("start_date").to_python(start_date)
+        return to_uuid(parent_project_id), week_start(start_date), to_uuid(assignee_id)
+
+    @classmethod
+    def daily_key(cls, parent_project_id, parent_task_id, status) -> DailyTaskKey | None:
+        """Registro de DailyTaskCount en el que cuenta una tarea (solo cuentan las de primer nivel)."""
+        if parent_task_id is not None:
+            return None
+        return cls._meta.pk.to_python(parent_project_id), int(status)
+
+    def invalidate_breadcrumbs(self) -> None:
+        """Descarta las migajas en caché de esta tarea y de todas sus subtareas."""
+        task_ids = TaskClosure.objects.filter(ancestor_id=self.id).values_list("descendant_id", flat=True)
+        cache.delete_many([breadcrumbs_cache_key("task", task_id) for task_id in task_ids])
 
     def __str__(self):
         return self.name
+
+
+class TaskStatusChange(models.Model):
+    """Bitácora de cambios de estado de las tareas, incluyendo su creación (sin estado anterior)."""
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="status_changes")
+    project = models.ForeignKey(
+        "projects.Project", on_delete=models.CASCADE, null=False, blank=False, related_name="+")
+    from_status = models.SmallIntegerField(choices=Task.Status.choices, null=True, blank=True)
+    to_status = models.SmallIntegerField(choices=Task.Status.choices, null=False, blank=False)
+    changed_by = models.ForeignKey(
+        "users.User", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    changed_at = models.DateTimeField(default=timezone.now, null=False, blank=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=("task", "to_status", "changed_at"), name="status_change_task_idx"),
+            models.Index(fields=("project", "changed_at"), name="status_change_project_idx")
+        ]
+
+
+class TaskClosure(models.Model):
+    """Tabla de cierre de la jerarquía de tareas: un registro por cada par ancestro/descendiente."""
+    ancestor = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="descendant_links")
+    descendant = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="ancestor_links")
+    depth = models.PositiveSmallIntegerField(null=False, blank=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=("ancestor", "descendant"), name="unique_task_closure")
+        ]
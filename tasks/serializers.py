@@ -1,11 +1,13 @@
 import datetime
 from rest_framework import serializers
 
+from dashboards.cache import invalidate_dashboards
 from devotion.apis import create_event, update_event
-from devotion.serializers import CCModelSerializer
+from devotion.hierarchy import is_descendant
+from devotion.serializers import CCModelSerializer, ValuesSerializer, full_name
 from projects.models import Project
 from users.serializers import UserMinimalSerializer
-from .models import Task
+from .models import Task, TaskClosure
 
 
 def get_project_or_error(project_id: str) -> Project:
@@ -74,10 +76,70 @@ class TaskDashboardSerializer(CCModelSerializer):
                   "due_date", "parent_project")
 
 
+def iso_date(value: datetime.date) -> str:
+    return value.isoformat()
+
+
+ASSIGNEE_NAME = (("assignee__first_names", "assignee__last_names"), full_name)
+
+
+class SubtaskTableValuesSerializer(ValuesSerializer):
+    """Misma salida que SubtaskTableSerializer, sin instancias ni campos de DRF."""
+    fields = {
+        "id": ("id", str),
+        "name": "name",
+        "description": "description",
+        "status": "status",
+        "priority": "priority",
+        "start_date": ("start_date", iso_date),
+        "due_date": ("due_date", iso_date),
+        "assignee": ASSIGNEE_NAME,
+        "parent_project": "parent_project_id",
+        "parent_task": "parent_task_id"
+    }
+
+
+class SubtaskCalendarValuesSerializer(ValuesSerializer):
+    """Misma salida que SubtaskCalendarSerializer."""
+    fields = {
+        "id": ("id", str),
+        "name": "name",
+        "status": "status",
+        "priority": "priority"
+    }
+
+
+class SubtaskKanbanValuesSerializer(ValuesSerializer):
+    """Misma salida que SubtaskKanbanSerializer."""
+    fields = {
+        "id": ("id", str),
+        "name": "name",
+        "description": "description",
+        "priority": "priority",
+        "assignee": {
+            "id": ("assignee_id", str),
+            "name": ASSIGNEE_NAME
+        }
+    }
+
+
+class TaskDashboardValuesSerializer(ValuesSerializer):
+    """Misma salida que TaskDashboardSerializer."""
+    fields = {
+        "id": ("id", str),
+        "name": "name",
+        "description": "description",
+        "priority": "priority",
+        "due_date": ("due_date", iso_date),
+        "parent_project": "parent_project__name"
+    }
+
+
 class TaskDeserializer(serializers.Serializer):
     name = serializers.CharField(max_length=128, required=True)
     description = serializers.CharField(max_length=1024, required=False)
     priority = serializers.IntegerField(required=False)
+    status = serializers.IntegerField(required=False)
     start_date = serializers.DateField(required=False)
     due_date = serializers.DateField(required=True)
     parent_project = serializers.CharField(required=True)
@@ -85,19 +147,17 @@ class TaskDeserializer(serializers.Serializer):
     assignee = serializers.CharField(required=True)
 
     def validate(self, attrs):
-        # TODO: En teoría, falta revisar que no se haga un ciclo en
-        #  la jerarquía de tareas y proyectos.
-
         parent_project = get_project_or_error(attrs["parent_project"]) \
             if "parent_project" in attrs else self.instance.parent_project
 
         self.context["parent_project"] = parent_project
-        self.context["parent_project_task_count"] = parent_project.tasks.count()
 
         if "parent_task" in attrs:
             parent_task = get_task_or_error(attrs["parent_task"])
             if self.instance and self.instance.id == parent_task.id:
                 raise serializers.ValidationError("Una tarea no puede ser su propia tarea papá.")
+            if self.instance and is_descendant(TaskClosure, parent_task.id, self.instance.id):
+                raise serializers.ValidationError("Una tarea no puede ser hija de una de sus subtareas.")
             if parent_task.parent_project_id != parent_project.id:
                 raise serializers.ValidationError("La nueva tarea papá no pertenece al mismo proyecto.")
 
@@ -107,6 +167,9 @@ class TaskDeserializer(serializers.Serializer):
         if "priority" in attrs and attrs["priority"] not in Task.Priority.values:
             raise serializers.ValidationError("Valor de prioridad inválido.")
 
+        if "status" in attrs and attrs["status"] not in Task.Status.values:
+            raise serializers.ValidationError("Valor de status inválido.")
+
         try:
             start_date = attrs.get("start_date") or self.instance.start_date
         except AttributeError:
@@ -124,33 +187,36 @@ class TaskDeserializer(serializers.Serializer):
         validated_data.setdefault("priority", Task.Priority.MEDIUM)
         validated_data.setdefault("start_date", min(datetime.date.today(), validated_data["due_date"]))
         parent_project = self.context["parent_project"]
-        task_count = self.context["parent_project_task_count"]
 
-        task = Task.objects.create(
+        task = Task(
             name=validated_data["name"],
             description=validated_data.get("description"),
             status=Task.Status.NOT_STARTED,
             priority=validated_data["priority"],
             start_date=validated_data.get("start_date"),
             due_date=validated_data["due_date"],
-            parent_project_id=validated_data["parent_project"],
+            parent_project=parent_project,
             parent_task_id=validated_data.get("parent_task"),
             assignee_id=validated_data["assignee"]
         )
+        task.save(changed_by=self.context.get("user"))
 
-        parent_project.progress *= task_count
-        parent_project.progress /= task_count + 1
-        parent_project.save()
+        invalidate_dashboards(task.parent_project_id)
 
         create_event(task)
         return task
 
     def update(self, instance, validated_data):
+        old_project_id = instance.parent_project_id
+
         for attr, value in validated_data.items():
             if attr in ("parent_project", "parent_task", "assignee"):
                 attr += "_id"
             setattr(instance, attr, value)
 
-        instance.save()
+        instance.save(changed_by=self.context.get("user"))
+        invalidate_dashboards(instance.parent_project_id)
+        if str(old_project_id) != str(instance.parent_project_id):
+            invalidate_dashboards(old_project_id)
         update_event(instance, validated_data.keys())
         return instance
@@ -1,133 +1,274 @@
 import datetime
-from typing import Any, Iterable
+from typing import Any, Iterator
 
-import pytz
+from django.conf import settings
 from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
 from rest_framework.request import Request
 
+from dashboards.models import local_today, week_start
+from devotion.hierarchy import subtree_queryset
+from devotion.renderers import dumps, wants_positional_rows
 from projects.models import Project
 from .models import Task
-from .serializers import SubtaskTableSerializer, SubtaskCalendarSerializer, SubtaskKanbanSerializer
+from .serializers import SubtaskTableValuesSerializer, SubtaskCalendarValuesSerializer, SubtaskKanbanValuesSerializer
 
 
 JSONObject = dict[str, Any]
 
+# Semanas que muestra el calendario si no se pide otra ventana, y el máximo que se puede pedir
+CALENDAR_WEEKS = 5
+CALENDAR_MAX_WEEKS = 53
 
-def group_tasks_as_calendar(tasks: Iterable[Task], start_date: datetime.date | None) -> JSONObject | list[JSONObject]:
+
+class CalendarBadRequest(Exception):
+    pass
+
+
+def default_calendar_start(today: datetime.date) -> datetime.date:
+    """Domingo de la semana pasada: el calendario empieza una semana antes de la actual."""
+    return today - datetime.timedelta(days=today.weekday() + 8)
+
+
+def default_calendar_window(today: datetime.date) -> tuple[datetime.date, datetime.date]:
+    """CALENDAR_WEEKS semanas desde la semana pasada."""
+    start_date = default_calendar_start(today)
+    return start_date, start_date + datetime.timedelta(weeks=CALENDAR_WEEKS)
+
+
+def requested_calendar_window(
+        request: Request, today: datetime.date) -> tuple[datetime.date, datetime.date] | None:
+    """
+    Ventana del calendario pedida con `?from=` y `?to=` (YYYY-MM-DD, inclusivas)
+    o `?weeks=`: primer día y día siguiente al último. None si no se pidió.
+    """
+    date_from = request.query_params.get("from")
+    date_to = request.query_params.get("to")
+    weeks = request.query_params.get("weeks")
+    if not date_from and not date_to and not weeks:
+        return None
+
+    try:
+        weeks = int(weeks) if weeks else CALENDAR_WEEKS
+        date_from = datetime.date.fromisoformat(date_from) if date_from else None
+        date_to = datetime.date.fromisoformat(date_to) if date_to else None
+    except ValueError:
+        raise CalendarBadRequest("Las fechas deben tener el formato YYYY-MM-DD y las semanas deben ser un número.")
+
+    # Se valida antes de sumar fechas, para que un número enorme no desborde
+    window_error = f"La ventana del calendario debe ser de 1 a {CALENDAR_MAX_WEEKS} semanas."
+    if not 1 <= weeks <= CALENDAR_MAX_WEEKS:
+        raise CalendarBadRequest(window_error)
+
+    try:
+        if date_from is not None:
+            start_date = date_from
+        elif date_to is not None:
+            start_date = week_start(date_to) - datetime.timedelta(weeks=weeks - 1)
+        else:
+            start_date = default_calendar_start(today)
+        end_date = date_to + datetime.timedelta(days=1) if date_to else start_date + datetime.timedelta(weeks=weeks)
+        # En web la matriz empieza el domingo anterior, que también debe existir
+        week_start(start_date)
+    except OverflowError:
+        raise CalendarBadRequest("La ventana del calendario se sale de las fechas válidas.")
+
+    if end_date <= start_date or (end_date - start_date).days > CALENDAR_MAX_WEEKS * 7:
+        raise CalendarBadRequest(window_error)
+    return start_date, end_date
+
+
+def group_tasks_as_calendar(
+        tasks: QuerySet, start_date: datetime.date | None, positional: bool = False) -> JSONObject | list[JSONObject]:
     data = {}
 
     # Y EN TIEMPO LINEAL PAPITO QUE MAS QUIERES
-    for task in tasks:
+    rows = SubtaskCalendarValuesSerializer.serialize_with(tasks, "due_date", positional=positional)
+    for task, (due_date,) in rows:
         if start_date is None:
             # Si start_date es None, se usan fechas (iOS)
-            date = task.due_date.isoformat()
+            date = due_date.isoformat()
         else:
             # Si start_date tiene valor, se usan índices (web)
-            days_difference = (task.due_date - start_date).days
+            days_difference = (due_date - start_date).days
             calendar_row = days_difference // 7
             calendar_col = days_difference % 7
             date = (calendar_row, calendar_col)
 
         if date not in data:
             data[date] = []
-        data[date].append(SubtaskCalendarSerializer(task).data)
+        data[date].append(task)
 
     if start_date is None:
-        return data
-
-    return [
-        {"date": key, "tasks": value}
-        for key, value in data.items()
-    ]
+        grouped = data
+    else:
+        grouped = [
+            {"date": key, "tasks": value}
+            for key, value in data.items()
+        ]
 
+    if positional:
+        return {"columns": SubtaskCalendarValuesSerializer.columns, "groups": grouped}
+    return grouped
 
-def table_view_type(response: JSONObject, tasks: QuerySet) -> None:
-    response["tasks"] = SubtaskTableSerializer(tasks, many=True).data
 
+def table_view_type(response: JSONObject, tasks: QuerySet, positional: bool = False) -> None:
+    response["tasks"] = SubtaskTableValuesSerializer.serialize(tasks, positional)
 
-def calendar_view_type(response: JSONObject, tasks: QuerySet, platform: str) -> None:
-    today = datetime.datetime.now(pytz.timezone("Mexico/General")).date()
-    days_difference = today.weekday() + 8
 
+def calendar_view_type(
+        response: JSONObject, tasks: QuerySet, platform: str, positional: bool = False,
+        window: tuple[datetime.date, datetime.date] | None = None) -> None:
+    """
+    En web, la ventana (por default, CALENDAR_WEEKS semanas desde la semana
+    pasada) empieza en domingo para poder ubicar cada fecha en la matriz. En
+    iOS solo se filtra si se pidió una ventana.
+    """
+    today = local_today()
     start_date = None
 
     if platform == "web":
-        start_date = today - datetime.timedelta(days=days_difference)
-        end_date = start_date + datetime.timedelta(days=35)
-        tasks = tasks.filter(
-            due_date__gte=start_date,
-            due_date__lt=end_date
-        ).order_by("due_date")
+        if window is None:
+            window = default_calendar_window(today)
+        start_date, end_date = week_start(window[0]), window[1]
+        tasks = tasks.filter(due_date__gte=start_date, due_date__lt=end_date)
+
+        days_difference = (today - start_date).days
+        response["today"] = [days_difference // 7, days_difference % 7] if start_date <= today < end_date else None
+    elif window is not None:
+        tasks = tasks.filter(due_date__gte=window[0], due_date__lt=window[1])
+
+    response["tasks"] = group_tasks_as_calendar(tasks.order_by("due_date"), start_date, positional)
 
-        today_row = days_difference // 7
-        today_col = days_difference % 7
-        response["today"] = [today_row, today_col]
 
-    response["tasks"] = group_tasks_as_calendar(tasks, start_date)
+KANBAN_COLUMNS = {
+    Task.Status.NOT_STARTED: "notStarted",
+    Task.Status.IN_PROGRESS: "inProgress",
+    Task.Status.IN_REVIEW: "inReview",
+    Task.Status.DONE: "done"
+}
 
 
-def kanban_view_type(response: JSONObject, tasks: QuerySet) -> None:
+def kanban_view_type(response: JSONObject, tasks: QuerySet, positional: bool = False) -> None:
+    # Una sola consulta, ordenada por estado y prioridad, repartida en las columnas
     tasks = tasks.order_by("status", "-priority")
-    tasks = {
-        "notStarted": tasks.filter(status=Task.Status.NOT_STARTED),
-        "inProgress": tasks.filter(status=Task.Status.IN_PROGRESS),
-        "inReview": tasks.filter(status=Task.Status.IN_REVIEW),
-        "done": tasks.filter(status=Task.Status.DONE)
-    }
+    columns = {status: [] for status in KANBAN_COLUMNS}
+    for task, (task_status,) in SubtaskKanbanValuesSerializer.serialize_with(tasks, "status", positional=positional):
+        columns[task_status].append(task)
+
     response["tasks"] = {
-        key: SubtaskKanbanSerializer(value, many=True).data
-        for key, value in tasks.items()
+        KANBAN_COLUMNS[task_status]: SubtaskKanbanValuesSerializer.with_columns(rows) if positional else rows
+        for task_status, rows in columns.items()
     }
 
 
 def get_all_subtree(project_or_task: Project | Task, assignee_id: str | None = None) -> QuerySet:
-    """Obtiene todas las tareas debajo de un proyecto o tarea."""
-    all_tasks: QuerySet = project_or_task.tasks
-    all_tasks = all_tasks.filter(assignee_id=assignee_id) if assignee_id else (
-        all_tasks.all())
+    """
+    Obtiene todas las tareas debajo de un proyecto o tarea. Según SUBTREE_ENGINE,
+    se usa la tabla de cierre o una consulta recursiva sobre las llaves papá.
+    """
     is_task = isinstance(project_or_task, Task)
 
-    def recurse(_project_or_task: Project | Task) -> None:
-        nonlocal all_tasks
-
-        subitems = _project_or_task.tasks if is_task else (
-            _project_or_task.projects)
+    if settings.SUBTREE_ENGINE == "recursive":
+        if is_task:
+            all_tasks = subtree_queryset(Task, "parent_task", project_or_task.id)
+        else:
+            all_tasks = Task.objects.filter(
+                parent_project__in=subtree_queryset(Project, "parent", project_or_task.id, include_root=True)
+            )
+    elif is_task:
+        all_tasks = Task.objects.filter(
+            ancestor_links__ancestor_id=project_or_task.id,
+            ancestor_links__depth__gt=0
+        )
+    else:
+        all_tasks = Task.objects.filter(
+            parent_project__ancestor_links__ancestor_id=project_or_task.id
+        )
 
-        for subitem in subitems.all():
-            recurse(subitem)
-            if assignee_id:
-                all_tasks |= subitem.tasks.filter(assignee_id=assignee_id)
-            else:
-                all_tasks |= subitem.tasks.all()
+    if assignee_id:
+        all_tasks = all_tasks.filter(assignee_id=assignee_id)
 
-    recurse(project_or_task)
     return all_tasks
 
 
-def handle_subtasks_response(
-        request: Request, response: JSONObject, project_or_task: Project | Task) -> None:
-
+def get_subtasks(request: Request, project_or_task: Project | Task) -> QuerySet:
+    """Tareas hijas (o todo el subárbol, con `?subtree=true`) de un proyecto o tarea."""
     is_task = isinstance(project_or_task, Task)
-    platform = request.query_params.get("platform", "web")
-    view_type = request.query_params.get("view", "table")
     get_subtree = request.query_params.get("subtree", "false") == "true"
     filter_assigned = request.query_params.get("assigned", "false") == "true"
     assignee_id = request.user.id if filter_assigned else None
 
     if get_subtree:
-        tasks = get_all_subtree(project_or_task, assignee_id)
+        return get_all_subtree(project_or_task, assignee_id)
+
+    tasks = project_or_task.tasks.all() if is_task else (
+        project_or_task.tasks.filter(parent_task__isnull=True))
+    if assignee_id:
+        tasks = tasks.filter(assignee_id=assignee_id)
+    return tasks
+
+
+def stream_json(head: bytes, rows: Iterator[JSONObject], tail: bytes) -> Iterator[bytes]:
+    """Escribe `head`, los renglones como elementos de un arreglo JSON y `tail`, de a bloques."""
+    yield head
+    chunk = []
+    for i, row in enumerate(rows):
+        chunk.append(dumps(row) if i == 0 else b"," + dumps(row))
+        if len(chunk) == settings.STREAM_CHUNK_SIZE:
+            yield b"".join(chunk)
+            chunk = []
+    yield b"".join(chunk) + tail
+
+
+def stream_table_response(response: JSONObject | None, tasks: QuerySet, platform: str) -> StreamingHttpResponse:
+    """
+    Respuesta de la vista de tabla que se escribe conforme se leen las tareas
+    (con .iterator), sin armar la lista completa en memoria. El JSON es igual
+    al de la respuesta normal: `response` con la lista en "tasks", o solo la
+    lista si `response` es None.
+    """
+    if response is None:
+        head, tail = b"[", b"]"
     else:
-        tasks = project_or_task.tasks.all() if is_task else (
-            project_or_task.tasks.filter(parent_task__isnull=True))
-        if assignee_id:
-            tasks = tasks.filter(assignee_id=assignee_id)
+        head = dumps(response)[:-1] + (b"," if response else b"") + b'"tasks":'
+        tail = b"]}"
+        if platform == "ios":
+            head += b'{"type":"table","data":'
+            tail += b"}"
+        head += b"["
+
+    rows = SubtaskTableValuesSerializer.iterate(tasks, settings.STREAM_CHUNK_SIZE)
+    return StreamingHttpResponse(stream_json(head, rows, tail), content_type="application/json")
+
+
+def stream_subtasks_response(
+        request: Request, response: JSONObject, project_or_task: Project | Task) -> StreamingHttpResponse | None:
+    """Con `?stream=true` y la vista de tabla en JSON, regresa la respuesta en streaming; si no, None."""
+    if request.query_params.get("stream", "false") != "true" \
+            or request.query_params.get("view", "table") != "table" \
+            or wants_positional_rows(request):
+        return None
+
+    platform = request.query_params.get("platform", "web")
+    return stream_table_response(response, get_subtasks(request, project_or_task), platform)
+
+
+def handle_subtasks_response(
+        request: Request, response: JSONObject, project_or_task: Project | Task) -> None:
+
+    platform = request.query_params.get("platform", "web")
+    view_type = request.query_params.get("view", "table")
+    tasks = get_subtasks(request, project_or_task)
+    positional = wants_positional_rows(request)
 
     if view_type == "calendar":
-        calendar_view_type(response, tasks, platform)
+        window = requested_calendar_window(request, local_today())
+        calendar_view_type(response, tasks, platform, positional, window)
     elif view_type == "kanban":
-        kanban_view_type(response, tasks)
+        kanban_view_type(response, tasks, positional)
     else:
-        table_view_type(response, tasks)
+        table_view_type(response, tasks, positional)
 
     if platform == "ios":
         response["tasks"] = {
@@ -136,7 +277,27 @@ def handle_subtasks_response(
         }
 
 
+def accessible_project_ids(user) -> set:
+    """Ids de los proyectos de los que el usuario es miembro, en una sola consulta."""
+    return set(user.member_of.values_list("id", flat=True))
+
+
 def handle_global_calendar_response(request: Request, response: JSONObject) -> None:
-    user = request.user
-    tasks = Task.objects.filter(parent_project__in=user.member_of.all())
-    calendar_view_type(response, tasks)
+    """
+    Calendario con las tareas de todos los proyectos del usuario. Los ids se
+    calculan antes y se filtran junto con la ventana de fechas, que el índice
+    (due_date, parent_project) resuelve sin recorrer cada proyecto. A
+    diferencia del calendario de un proyecto, en iOS también se usa la ventana
+    por default, para no regresar las tareas de todos los proyectos sin límite.
+    """
+    platform = request.query_params.get("platform", "web")
+    today = local_today()
+    window = requested_calendar_window(request, today) or default_calendar_window(today)
+    tasks = Task.objects.filter(parent_project_id__in=accessible_project_ids(request.user))
+    calendar_view_type(response, tasks, platform, wants_positional_rows(request), window)
+
+    if platform == "ios":
+        response["tasks"] = {
+            "type": "calendar",
+            "data": response["tasks"]
+        }
@@ -1,8 +1,20 @@
+import datetime
+import json
+import unittest
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from devotion.renderers import FastJSONRenderer, msgpack
 from rest_framework.test import APIClient
 from users.models import User
 from projects.models import Project
+from dashboards.models import local_today
 from .models import Task
+from .serializers import (
+    TaskSerializer, SubtaskTableSerializer, SubtaskTableValuesSerializer, SubtaskCalendarSerializer,
+    SubtaskCalendarValuesSerializer, SubtaskKanbanSerializer, SubtaskKanbanValuesSerializer, TaskDashboardSerializer,
+    TaskDashboardValuesSerializer)
 
 
 class TasksTestCase(TestCase):
@@ -88,3 +100,217 @@ class TasksTestCase(TestCase):
         )
         self.assertEqual(response.status_code, 400)
         self.assertEqual(Task.objects.count(), 2)
+
+    def test_progress_counters(self):
+        self.client.force_authenticate(self.checo)
+        response = self.client.post(
+            "/tasks/",
+            {
+                "name": "Tarea 2",
+                "due_date": "2024-01-01",
+                "parent_project": self.fsae.id,
+                "parent_task": self.task1.id,
+                "assignee": self.checo.id
+            }
+        )
+        self.assertEqual(response.status_code, 201)
+        self.fsae.refresh_from_db()
+        self.assertEqual((self.fsae.total_tasks, self.fsae.done_tasks), (2, 0))
+
+        response = self.client.put(f"/tasks/{response.data['id']}/status/", {"status": Task.Status.DONE})
+        self.assertEqual(response.status_code, 200)
+        self.fsae.refresh_from_db()
+        self.assertEqual(self.fsae.progress, 50)
+
+        # Borrar la tarea papá también descuenta la subtarea completada
+        response = self.client.delete(f"/tasks/{self.task1.id}/")
+        self.assertEqual(response.status_code, 204)
+        self.fsae.refresh_from_db()
+        self.assertEqual((self.fsae.total_tasks, self.fsae.done_tasks), (0, 0))
+        self.assertEqual(self.fsae.progress, 0)
+
+    def test_values_serializers(self):
+        Task.objects.create(
+            name="Subtarea",
+            description="Con descripción",
+            start_date="2024-01-02",
+            due_date="2024-01-05",
+            parent_project=self.fsae,
+            parent_task=self.task1,
+            assignee=self.verstappen,
+            status=Task.Status.DONE,
+            priority=Task.Priority.HIGH,
+        )
+        tasks = Task.objects.order_by("name")
+
+        # El JSON final debe ser idéntico, incluyendo el orden de las claves
+        for serializer, values_serializer in (
+                (SubtaskTableSerializer, SubtaskTableValuesSerializer),
+                (SubtaskCalendarSerializer, SubtaskCalendarValuesSerializer),
+                (SubtaskKanbanSerializer, SubtaskKanbanValuesSerializer),
+                (TaskDashboardSerializer, TaskDashboardValuesSerializer)):
+            with self.subTest(serializer=serializer.__name__):
+                self.assertEqual(
+                    json.dumps(values_serializer.serialize(tasks), cls=DjangoJSONEncoder),
+                    json.dumps(serializer(tasks, many=True).data, cls=DjangoJSONEncoder))
+
+        # El renderer de la API produce el mismo JSON que el de DRF
+        data = {"tasks": SubtaskTableValuesSerializer.serialize(tasks), "today": datetime.date(2024, 1, 1)}
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+    def test_renderer_parity(self):
+        self.task1.description = "Primera línea\u2028segunda\u2029tercera"
+        self.task1.created_at = datetime.datetime(2024, 1, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+        self.task1.save()
+
+        # Los bytes deben ser idénticos: microsegundos, "Z" y separadores de línea escapados
+        data = {**TaskSerializer(self.task1).data, "createdAt": self.task1.created_at}
+        rendered = FastJSONRenderer().render(data)
+        self.assertEqual(rendered, JSONRenderer().render(data))
+        self.assertIn(b'"createdAt":"2024-01-01T12:30:15.123456Z"', rendered)
+
+    def test_kanban_single_query(self):
+        for i, task_status in enumerate(Task.Status.values * 2):
+            Task.objects.create(
+                name=f"Tarea kanban {i}",
+                start_date="2024-01-02",
+                due_date="2024-01-05",
+                parent_project=self.fsae,
+                assignee=self.verstappen if i % 2 else self.checo,
+                status=task_status,
+                priority=i % 3,
+            )
+
+        # El proyecto y una sola consulta de tareas, sin importar cuántas columnas haya
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/projects/{self.fsae.id}/?get=tasks&view=kanban")
+
+        tasks = self.fsae.tasks.filter(parent_task__isnull=True).order_by("status", "-priority")
+        expected = {
+            key: SubtaskKanbanSerializer(tasks.filter(status=task_status), many=True).data
+            for key, task_status in zip(("notStarted", "inProgress", "inReview", "done"), Task.Status.values)
+        }
+        self.assertEqual(json.loads(json.dumps(response.data["tasks"], cls=DjangoJSONEncoder)),
+                         json.loads(json.dumps(expected, cls=DjangoJSONEncoder)))
+
+    def test_calendar_window(self):
+        for due_date in ("2024-02-14", "2024-03-31", "2024-04-01"):
+            Task.objects.create(
+                name=f"Entrega {due_date}",
+                start_date="2024-01-01",
+                due_date=due_date,
+                parent_project=self.fsae,
+                assignee=self.checo,
+                status=Task.Status.IN_PROGRESS,
+                priority=Task.Priority.HIGH,
+            )
+        url = f"/projects/{self.fsae.id}/?get=tasks&view=calendar"
+
+        # Un trimestre: la matriz empieza el domingo anterior a `from` y `to` es inclusivo
+        with self.assertNumQueries(2):
+            response = self.client.get(url + "&from=2024-01-01&to=2024-03-31")
+        self.assertEqual(
+            [(group["date"], [task["name"] for task in group["tasks"]]) for group in response.data["tasks"]],
+            [((0, 1), ["Tarea 1"]), ((6, 3), ["Entrega 2024-02-14"]), ((13, 0), ["Entrega 2024-03-31"])]
+        )
+
+        response = self.client.get(url + "&from=2024-02-01&weeks=8&platform=ios")
+        self.assertEqual(list(response.data["tasks"]["data"]), ["2024-02-14"])
+
+        for params in ("&weeks=0", "&weeks=100", "&weeks=1000000", "&to=2026-01-01&weeks=200000",
+                       "&from=9999-12-01", "&from=0001-01-01", "&to=0001-01-02&weeks=5", "&from=2024-13-01",
+                       "&from=2024-03-01&to=2024-02-01"):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url + params).status_code, 400)
+
+    def test_global_calendar(self):
+        motor = Project.objects.create(name="Motor")
+        motor.members.set([self.checo])
+        ajeno = Project.objects.create(name="Ajeno")
+        for name, project in (("Pistones", motor), ("Ajena", ajeno)):
+            Task.objects.create(
+                name=name,
+                start_date="2024-01-01",
+                due_date="2024-01-03",
+                parent_project=project,
+                assignee=self.verstappen,
+                status=Task.Status.NOT_STARTED,
+                priority=Task.Priority.LOW,
+            )
+
+        # Los ids de los proyectos del usuario y las tareas de la ventana
+        self.client.force_authenticate(self.checo)
+        with self.assertNumQueries(2):
+            response = self.client.get("/me/calendar/?from=2024-01-01&to=2024-01-31")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(group["date"], [task["name"] for task in group["tasks"]]) for group in response.data["tasks"]],
+            [((0, 1), ["Tarea 1"]), ((0, 3), ["Pistones"])]
+        )
+
+        response = self.client.get("/me/calendar/?from=2024-01-01&to=2024-01-31&platform=ios")
+        self.assertEqual(list(response.data["tasks"]["data"]), ["2024-01-01", "2024-01-03"])
+
+        # Sin ventana, iOS también recibe solo las semanas del calendario por default
+        today = local_today()
+        Task.objects.create(
+            name="Cigüeñal",
+            start_date=today,
+            due_date=today,
+            parent_project=motor,
+            assignee=self.verstappen,
+            status=Task.Status.NOT_STARTED,
+            priority=Task.Priority.LOW,
+        )
+        response = self.client.get("/me/calendar/?platform=ios")
+        self.assertEqual(list(response.data["tasks"]["data"]), [today.isoformat()])
+        self.assertEqual(self.client.get("/me/calendar/?weeks=abc").status_code, 400)
+
+    def test_streaming_table(self):
+        for i in range(3):
+            Task.objects.create(
+                name=f"Subtarea {i}",
+                start_date="2024-01-02",
+                due_date="2024-01-05",
+                parent_project=self.fsae,
+                parent_task=self.task1,
+                assignee=self.verstappen,
+                status=Task.Status.IN_PROGRESS,
+                priority=Task.Priority.LOW,
+            )
+
+        urls = (
+            f"/projects/{self.fsae.id}/?view=table&subtree=true",
+            f"/projects/{self.fsae.id}/?view=table&subtree=true&platform=ios",
+            f"/projects/{self.fsae.id}/?get=tasks",
+            f"/tasks/{self.task1.id}/subtree/",
+        )
+        with self.settings(STREAM_CHUNK_SIZE=2):
+            for url in urls:
+                with self.subTest(url=url):
+                    expected = json.loads(self.client.get(url).content)
+                    response = self.client.get(url + ("&" if "?" in url else "?") + "stream=true")
+                    self.assertTrue(response.streaming)
+                    self.assertEqual(json.loads(b"".join(response.streaming_content)), expected)
+
+    @unittest.skipIf(msgpack is None, "msgpack no está instalado")
+    def test_msgpack_rows(self):
+        base = f"/projects/{self.fsae.id}/?subtree=true"
+        for view in ("table", "kanban", "calendar"):
+            with self.subTest(view=view):
+                url = f"{base}&view={view}&platform=ios"
+                expected = json.loads(self.client.get(url).content)["tasks"]["data"]
+                response = self.client.get(url, HTTP_ACCEPT="application/msgpack")
+                self.assertEqual(response["Content-Type"], "application/msgpack")
+                data = msgpack.unpackb(response.content)["tasks"]["data"]
+
+                # Los renglones, con sus columnas, deben dar los mismos objetos que el JSON
+                if view == "table":
+                    rows = [dict(zip(data["columns"], row)) for row in data["rows"]]
+                elif view == "kanban":
+                    rows = {key: [dict(zip(value["columns"], row)) for row in value["rows"]]
+                            for key, value in data.items()}
+                else:
+                    rows = {key: [dict(zip(data["columns"], row)) for row in value]
+                            for key, value in data["groups"].items()}
+                self.assertEqual(rows, expected)
@@ -1,4 +1,6 @@
-from django.db.models.query import QuerySet
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, Value
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -6,11 +8,16 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from dashboards.cache import invalidate_dashboards
 from devotion.apis import delete_event, GoogleAPIException
-from .models import Task
-from .subtasks import handle_subtasks_response
+from devotion.hierarchy import breadcrumbs_cache_key
+from devotion.renderers import wants_positional_rows
+from projects.models import ProjectClosure
+from .models import Task, TaskClosure
+from .subtasks import (
+    CalendarBadRequest, handle_subtasks_response, get_all_subtree, stream_subtasks_response, stream_table_response)
 from .serializers import (
-    TaskSerializer, TaskViewSerializer, SubtaskTableSerializer, TaskDeserializer)
+    TaskSerializer, TaskViewSerializer, SubtaskTableValuesSerializer, TaskDeserializer)
 
 
 def bad_request(message: str) -> Response:
@@ -34,7 +41,7 @@ def create_task(request: Request) -> Response:
     - assignee
     """
     data = request.data
-    serializer = TaskDeserializer(data=data)
+    serializer = TaskDeserializer(data=data, context={"user": request.user})
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -53,21 +60,28 @@ def create_task(request: Request) -> Response:
 
 
 def get_task_breadcrumbs(task: Task) -> list[tuple[str, str, bool]]:
-    breadcrumbs = [(task.id, task.name, True)]
-    project = task.parent_project
-    task = task.parent_task
-
-    while task is not None:
-        breadcrumbs.append((task.id, task.name, True))
-        task = task.parent_task
-
-    breadcrumbs.append((project.id, "Tareas", False))
-
-    while project is not None:
-        breadcrumbs.append((project.id, project.name, False))
-        project = project.parent
-
-    breadcrumbs.reverse()
+    """Obtiene la ruta de proyectos y tareas desde la raíz en una sola consulta, o desde el caché."""
+    cache_key = breadcrumbs_cache_key("task", task.id)
+    breadcrumbs = cache.get(cache_key)
+    if breadcrumbs is not None:
+        return breadcrumbs
+
+    is_task = BooleanField()
+    project_ancestors = ProjectClosure.objects.filter(descendant_id=task.parent_project_id).annotate(
+        is_task=Value(False, output_field=is_task)
+    ).values_list("ancestor_id", "ancestor__name", "depth", "is_task")
+    task_ancestors = TaskClosure.objects.filter(descendant_id=task.id).annotate(
+        is_task=Value(True, output_field=is_task)
+    ).values_list("ancestor_id", "ancestor__name", "depth", "is_task")
+
+    # Primero los proyectos, luego las tareas; cada grupo de la raíz hacia abajo
+    ancestors = sorted(project_ancestors.union(task_ancestors, all=True), key=lambda a: (a[3], -a[2]))
+    breadcrumbs = [(ancestor_id, name, ancestor_is_task) for ancestor_id, name, _, ancestor_is_task in ancestors]
+
+    project_count = len(breadcrumbs) - sum(ancestor[3] for ancestor in ancestors)
+    breadcrumbs.insert(project_count, (task.parent_project_id, "Tareas", False))
+
+    cache.set(cache_key, breadcrumbs, settings.BREADCRUMBS_CACHE_TIMEOUT)
     return breadcrumbs
 
 
@@ -94,7 +108,13 @@ class TaskView(APIView):
             response["breadcrumbs"] = get_task_breadcrumbs(task)
 
         if response_fields in ("tasks", "all"):
-            handle_subtasks_response(request, response, task)
+            streaming_response = stream_subtasks_response(request, response, task)
+            if streaming_response is not None:
+                return streaming_response
+            try:
+                handle_subtasks_response(request, response, task)
+            except CalendarBadRequest as e:
+                return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(response, status=status.HTTP_200_OK)
 
@@ -112,19 +132,11 @@ class TaskView(APIView):
                 status=status.HTTP_403_FORBIDDEN)
 
         data = request.data
-        serializer = TaskDeserializer(task, data=data, partial=True)
+        serializer = TaskDeserializer(task, data=data, partial=True, context={"user": user})
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         task = serializer.save()
-
-        if "status" in data and data["status"] == Task.Status.DONE:
-            task_count = task.parent_project.tasks.count()
-            task.parent_project.progress *= task_count
-            task.parent_project.progress += 1
-            task.parent_project.progress /= task_count
-            task.parent_project.save()
-
         serializer = TaskSerializer(task)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -143,16 +155,7 @@ class TaskView(APIView):
                 status=status.HTTP_403_FORBIDDEN)
 
         task.delete()
-
-        task_count = parent_project.tasks.count()
-        if task_count == 0:
-            parent_project.progress = 0
-        else:
-            parent_project.progress *= task_count + 1
-            if task.status == Task.Status.DONE:
-                parent_project.progress -= 100
-            parent_project.progress /= task_count
-        parent_project.save()
+        invalidate_dashboards(parent_project.id)
 
         try:
             delete_event(task)
@@ -200,39 +203,26 @@ def update_task_status(request: Request, task_id: str) -> Response:
             status=status.HTTP_403_FORBIDDEN)
 
     task.status = new_status
-    task.save()
-
-    task_count = parent_project.tasks.count()
-    if old_status == Task.Status.DONE:
-        parent_project.progress *= task_count
-        parent_project.progress -= 100
-        parent_project.progress /= task_count
-    if new_status == Task.Status.DONE:
-        parent_project.progress *= task_count
-        parent_project.progress += 100
-        parent_project.progress /= task_count
-    parent_project.save()
+    task.save(changed_by=user)
+    invalidate_dashboards(parent_project.id)
 
     serializer = TaskSerializer(task)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @api_view(["GET"])
-def get_all_subtree_tasks(_request: Request, task_id: str) -> Response:
+def get_all_subtree_tasks(request: Request, task_id: str) -> Response:
     """Obtiene todas las subtareas de una tarea."""
     try:
         task = Task.objects.get(id=task_id)
     except Task.DoesNotExist:
         return Response({"message": "Tarea no encontrada."}, status=status.HTTP_404_NOT_FOUND)
 
-    all_tasks: QuerySet = task.tasks.all()
+    filter_assigned = request.query_params.get("assigned", "false") == "true"
+    assignee_id = request.user.id if filter_assigned else None
 
-    def recurse_task(_task: Task) -> None:
-        nonlocal all_tasks
-        for subtask in _task.tasks.all():
-            recurse_task(subtask)
-            all_tasks |= _task.tasks.all()
-
-    recurse_task(task)
-    serializer = SubtaskTableSerializer(all_tasks, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    all_tasks = get_all_subtree(task, assignee_id)
+    positional = wants_positional_rows(request)
+    if request.query_params.get("stream", "false") == "true" and not positional:
+        return stream_table_response(None, all_tasks, "web")
+    return Response(SubtaskTableValuesSerializer.serialize(all_tasks, positional), status=status.HTTP_200_OK)
@@ -37,7 +37,8 @@ class UserRoleSerializer(CCModelSerializer):
         return f"{obj.first_names} {obj.last_names}"
 
     def get_is_leader(self, obj):
-        return obj in self.context["project"].leaders.all()
+        # Los ids de los líderes se calculan una vez para todo el proyecto
+        return obj.id in self.context["leader_ids"]
 
 
 class UserDeserializer(serializers.Serializer):
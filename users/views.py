@@ -10,7 +10,7 @@ from rest_framework_simplejwt.tokens import AccessToken
 
 from projects.models import Project
 from projects.serializers import ProjectSerializer
-from tasks.subtasks import handle_global_calendar_response
+from tasks.subtasks import CalendarBadRequest, handle_global_calendar_response
 from .models import User
 from .serializers import UserSerializer, UserMinimalSerializer, UserDeserializer
 
@@ -127,5 +127,8 @@ def get_user_search_select_pool(request: Request) -> Response:
 def get_current_user_global_calendar(request: Request) -> Response:
     """Obtiene el calendario global del usuario autenticado."""
     response = {}
-    handle_global_calendar_response(request, response)
+    try:
+        handle_global_calendar_response(request, response)
+    except CalendarBadRequest as e:
+        return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
     return Response(response, status=status.HTTP_200_OK)